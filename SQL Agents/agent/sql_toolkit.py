@@ -1,18 +1,39 @@
+from functools import lru_cache
 from langchain.agents import create_sql_agent
 from langchain.agents.agent_toolkits import SQLDatabaseToolkit
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.sql_database import SQLDatabase
 from config import GEMINI_API_KEY, DB_PATH
 
-def get_sql_agent(relevant_tables):
-    llm = ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0)
-    db = SQLDatabase.from_uri(f"sqlite:///{DB_PATH}")
-    # db = SQLDatabase.from_uri(f"sqlite:///{DB_PATH}", include_tables=relevant_tables, sample_rows_in_table_info=5)
+@lru_cache(maxsize=1)
+def get_llm():
+    return ChatGoogleGenerativeAI(model="gemini-2.0-flash-exp", temperature=0)
+
+# One database (engine + connection pool) shared by every agent; agents see all tables
+@lru_cache(maxsize=1)
+def _get_database():
+    return SQLDatabase.from_uri(f"sqlite:///{DB_PATH}")
+
+# Agents see every table, so one agent serves all table selections
+@lru_cache(maxsize=1)
+def _build_agent():
+    llm = get_llm()
+    db = _get_database()
     toolkit = SQLDatabaseToolkit(db=db, llm=llm)
 
     agent = create_sql_agent(
         llm=llm,
         toolkit=toolkit,
         verbose=True)
-    
+
     return agent
+
+def get_sql_agent(relevant_tables):
+    # relevant_tables only guides table selection upstream; the agent is shared
+    return _build_agent()
+
+def stream_agent_response(agent, user_query):
+    # Yield the final answer as soon as the agent finishes, for st.write_stream
+    for step in agent.stream({"input": user_query}):
+        if "output" in step:
+            yield step["output"]
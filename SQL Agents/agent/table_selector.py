@@ -1,25 +1,117 @@
+import os
+import faiss
+import numpy as np
+from functools import lru_cache
+from pathlib import Path
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from sqlalchemy import create_engine, inspect
 from config import GEMINI_API_KEY, DB_PATH
 
-#  Identify tables in my database
-def get_table_selector():
-    engine = create_engine(f"sqlite:///{DB_PATH}")
-    inspector = inspect(engine)
-    tables = inspector.get_table_names()
-    docs = [{"content": table, "metadata": {"table_name": table}} for table in tables]
+# Persisted table-name index, rebuilt when the database file changes
+INDEX_DIR = Path(".cache/tables")
+INDEX_MTIME_FILE = INDEX_DIR / "db_mtime"
+# Bump when the index layout changes so stale indexes are rebuilt
+INDEX_VERSION = 3
+# Above this many tables, exact search gives way to an int8 HNSW graph
+HNSW_THRESHOLD = 10_000
+
+faiss.omp_set_num_threads(os.cpu_count() or 1)
 
-    embeddings = GoogleGenerativeAIEmbeddings(
+_engine = create_engine(
+    f"sqlite:///{DB_PATH}",
+    connect_args={"check_same_thread": False},
+    pool_pre_ping=False
+)
+# (sqlite mtime, table names) from the last schema inspection
+_tables_cache = (0.0, [])
+
+@lru_cache(maxsize=1)
+def get_embeddings():
+    return GoogleGenerativeAIEmbeddings(
         model="models/embedding-001",
         google_api_key=GEMINI_API_KEY
     )
-    vectorstore = FAISS.from_texts(
-        [doc["content"] for doc in docs],
-        embedding=embeddings
+
+def get_table_names(db_mtime=None):
+    global _tables_cache
+    if db_mtime is None:
+        db_mtime = os.stat(DB_PATH).st_mtime
+    if db_mtime != _tables_cache[0]:
+        _tables_cache = (db_mtime, inspect(_engine).get_table_names())
+    return _tables_cache[1]
+
+def _new_index(dim, count):
+    if count > HNSW_THRESHOLD:
+        return faiss.IndexHNSWSQ(dim, faiss.ScalarQuantizer.QT_8bit, 32, faiss.METRIC_INNER_PRODUCT)
+    return faiss.IndexFlatIP(dim)
+
+#  Identify tables in my database
+def get_table_selector():
+    return _load_table_selector(os.stat(DB_PATH).st_mtime)
+
+@lru_cache(maxsize=1)
+def _load_table_selector(db_mtime):
+    embeddings = get_embeddings()
+    stamp = f"{INDEX_VERSION}:{db_mtime!r}"
+    if (INDEX_DIR / "index.faiss").exists() and INDEX_MTIME_FILE.exists() \
+            and INDEX_MTIME_FILE.read_text() == stamp:
+        return FAISS.load_local(
+            str(INDEX_DIR),
+            embeddings,
+            allow_dangerous_deserialization=True,
+            distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+            normalize_L2=True
+        )
+
+    tables = get_table_names(db_mtime)
+
+    # One batched embedding request for every table name; cosine similarity
+    # as inner product over L2-normalized vectors
+    vectors = embeddings.embed_documents(tables)
+    index = _new_index(len(vectors[0]), len(vectors))
+    if not index.is_trained:
+        # Scalar quantizer ranges are learned from the normalized vectors
+        training = np.asarray(vectors, dtype=np.float32)
+        faiss.normalize_L2(training)
+        index.train(training)
+
+    vectorstore = FAISS(
+        embedding_function=embeddings,
+        index=index,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=DistanceStrategy.MAX_INNER_PRODUCT,
+        normalize_L2=True
+    )
+    vectorstore.add_embeddings(
+        list(zip(tables, vectors)),
+        metadatas=[{"table_name": table} for table in tables]
     )
+
+    vectorstore.save_local(str(INDEX_DIR))
+    INDEX_MTIME_FILE.write_text(stamp)
     return vectorstore
 
 def select_relevant_tables(user_query, vectorstore, k=5):
-    docs = vectorstore.similarity_search(user_query, k=k)
-    return [doc.page_content for doc in docs]
+    """Return table names for a query, or a list of results for a list of queries"""
+    queries = [user_query] if isinstance(user_query, str) else list(user_query)
+
+    # Embed all queries together and search them as one matrix
+    matrix = np.asarray(
+        get_embeddings().embed_documents(queries, task_type="retrieval_query"),
+        dtype=np.float32
+    )
+    faiss.normalize_L2(matrix)
+    _, indices = vectorstore.index.search(matrix, k)
+
+    results = [
+        [
+            vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).page_content
+            for i in row if i != -1
+        ]
+        for row in indices
+    ]
+    return results[0] if isinstance(user_query, str) else results
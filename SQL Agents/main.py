@@ -1,5 +1,5 @@
 import streamlit as st
-from agent.sql_toolkit import get_sql_agent
+from agent.sql_toolkit import get_sql_agent, stream_agent_response
 from agent.table_selector import get_table_selector, select_relevant_tables
 from agent.planner import generate_plan
 from utils.security import is_rate_limited
@@ -14,7 +14,7 @@ try:
     # Handle multiple IPs in X-Forwarded-For (take first one)
     if "," in ip:
         ip = ip.split(", ")[0].strip()
-except:
+except (KeyError, AttributeError):
     ip = "127.0.0.1"
 
 if is_rate_limited(ip):
@@ -31,12 +31,10 @@ if user_query:
 
     st.subheader("📑 Table Selection")
     vectorstore = get_table_selector()
-    print("vectorstore", vectorstore)
     relevant_tables = select_relevant_tables(user_query, vectorstore)
     st.write("Likely Tables Used:", relevant_tables)
 
     st.subheader("🤖 Agent Response")
     agent = get_sql_agent(relevant_tables)
     with st.spinner("Generating SQL and fetching results..."):
-        response = agent.run(user_query)
-        st.Success(response)
+        st.write_stream(stream_agent_response(agent, user_query))
@@ -0,0 +1,46 @@
+import pytest
+
+from utils import security
+from utils.security import RATE_LIMIT, is_rate_limited
+
+START = 1_000_000.0
+WINDOW = 60
+
+@pytest.fixture(autouse=True)
+def clean_state(monkeypatch):
+    RATE_LIMIT.clear()
+    monkeypatch.setattr(security, "_last_sweep_minute", 0)
+    yield
+    RATE_LIMIT.clear()
+
+def _at(monkeypatch, now):
+    monkeypatch.setattr(security.time, "time", lambda: now)
+
+@pytest.mark.parametrize(
+    "elapsed, limited",
+    [
+        (0, True),
+        (WINDOW - 0.001, True),   # just inside the window: still counted
+        (WINDOW, False),          # exactly at the cutoff: expired (dq[0] <= cutoff)
+        (WINDOW + 0.001, False),  # just outside the window
+    ],
+)
+def test_window_boundary(monkeypatch, elapsed, limited):
+    _at(monkeypatch, START)
+    assert not is_rate_limited("1.2.3.4", window=WINDOW, max_requests=1)
+
+    _at(monkeypatch, START + elapsed)
+    assert is_rate_limited("1.2.3.4", window=WINDOW, max_requests=1) is limited
+
+@pytest.mark.parametrize("max_requests", [1, 3, 5])
+def test_limit_reached_within_window(monkeypatch, max_requests):
+    _at(monkeypatch, START)
+    for _ in range(max_requests):
+        assert not is_rate_limited("1.2.3.4", window=WINDOW, max_requests=max_requests)
+    assert is_rate_limited("1.2.3.4", window=WINDOW, max_requests=max_requests)
+
+def test_limits_are_per_ip(monkeypatch):
+    _at(monkeypatch, START)
+    assert not is_rate_limited("1.2.3.4", window=WINDOW, max_requests=1)
+    assert not is_rate_limited("5.6.7.8", window=WINDOW, max_requests=1)
+    assert is_rate_limited("1.2.3.4", window=WINDOW, max_requests=1)
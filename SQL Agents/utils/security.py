@@ -1,16 +1,37 @@
-import time 
+import time
+import threading
+from collections import defaultdict, deque
 
-RATE_LIMIT = {}
+__all__ = ["is_rate_limited"]
+
+RATE_LIMIT: dict[str, deque[float]] = defaultdict(deque)
+_lock = threading.Lock()
+_last_sweep_minute = 0
+
+def _sweep_idle(now, window):
+    """Drop IPs whose timestamps have all expired, at most once a minute"""
+    global _last_sweep_minute
+    minute = int(now // 60)
+    if minute == _last_sweep_minute:
+        return
+    _last_sweep_minute = minute
+
+    for ip in [ip for ip, dq in RATE_LIMIT.items() if not dq or now - dq[-1] >= window]:
+        del RATE_LIMIT[ip]
 
 def is_rate_limited(ip, window=60, max_requests=5):
     now = time.time()
+    cutoff = now - window
+
+    with _lock:
+        _sweep_idle(now, window)
+
+        dq = RATE_LIMIT[ip]
+        while dq and dq[0] <= cutoff:
+            dq.popleft()
+
+        if len(dq) >= max_requests:
+            return True
 
-    if ip not in RATE_LIMIT:
-        RATE_LIMIT[ip] = []
-    RATE_LIMIT[ip] = [timestamp for timestamp in RATE_LIMIT[ip] if now - timestamp < window]
-    
-    if len(RATE_LIMIT[ip]) >= max_requests:
-        return True
-    
-    RATE_LIMIT[ip].append(now)
-    return False
\ No newline at end of file
+        dq.append(now)
+        return False
@@ -6,6 +6,8 @@ Demonstration of multi-PDF ingestion with async processing
 import sys
 import os
 import asyncio
+import multiprocessing
+import logging
 from pathlib import Path
 
 # Add src to path
@@ -13,10 +15,13 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from rag.pipeline import get_rag_pipeline
 
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
+
 async def demo_multi_pdf_ingestion():
     """Demo multiple PDF ingestion with async processing"""
-    print("🏥 Medical Research AI Assistant - Multi-PDF Demo")
-    print("=" * 50)
+    logger.info("🏥 Medical Research AI Assistant - Multi-PDF Demo")
+    logger.info("=" * 50)
     
     try:
         # Initialize RAG pipeline
@@ -34,16 +39,16 @@ async def demo_multi_pdf_ingestion():
             if os.path.exists(pdf_path):
                 existing_pdfs.append(pdf_path)
             else:
-                print(f"⚠️  PDF not found: {pdf_path} (skipping for demo)")
+                logger.warning("⚠️  PDF not found: %s (skipping for demo)", pdf_path)
         
         if existing_pdfs:
-            print(f"\n📚 Ingesting {len(existing_pdfs)} medical research PDFs...")
+            logger.info("\n📚 Ingesting %s medical research PDFs...", len(existing_pdfs))
             result = await pipeline.ingest_multiple_pdfs_async(existing_pdfs)
             
-            print(f"✅ Ingestion complete!")
-            print(f"   📄 Files: {result['files_processed']}")
-            print(f"   📖 Pages: {result['total_pages']}")
-            print(f"   🧩 Chunks: {result['total_chunks']}")
+            logger.info("✅ Ingestion complete!")
+            logger.info("   📄 Files: %s", result['files_processed'])
+            logger.info("   📖 Pages: %s", result['total_pages'])
+            logger.info("   🧩 Chunks: %s", result['total_chunks'])
         
         # Setup retriever for querying
         pipeline.setup_retriever()
@@ -55,32 +60,33 @@ async def demo_multi_pdf_ingestion():
             "What are the key limitations mentioned in the research?"
         ]
         
-        print(f"\n🔍 Running {len(queries)} async queries...")
+        logger.info("\n🔍 Running %s async queries...", len(queries))
         
         # Run queries asynchronously
         tasks = [pipeline.query_async(query) for query in queries]
         results = await asyncio.gather(*tasks)
         
-        for i, result in enumerate(results, 1):
-            print(f"\n📋 Query {i}: {result['question']}")
-            print(f"📝 Answer: {result['answer'][:200]}...")
-            print(f"📊 Sources: {', '.join(result['sources'])}")
-            print(f"🧩 Chunks found: {result['chunks_found']}")
+        if logger.isEnabledFor(logging.INFO):
+            for i, result in enumerate(results, 1):
+                logger.info("\n📋 Query %s: %s", i, result['question'])
+                logger.info("📝 Answer: %s...", result['answer'][:200])
+                logger.info("📊 Sources: %s", ', '.join(result['sources']))
+                logger.info("🧩 Chunks found: %s", result['chunks_found'])
         
-        print("\n🎉 Multi-PDF async demo complete!")
+        logger.info("\n🎉 Multi-PDF async demo complete!")
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        print("\n💡 Setup checklist:")
-        print("1. Set GEMINI_API_KEY in your .env file")
-        print("2. Start Qdrant: docker-compose up -d")
-        print("3. Place your medical research PDFs in the project root")
-        print("4. Update pdf_files list with your actual PDF paths")
+        logger.error("❌ Error: %s", e)
+        logger.info("\n💡 Setup checklist:")
+        logger.info("1. Set GEMINI_API_KEY in your .env file")
+        logger.info("2. Start Qdrant: docker-compose up -d")
+        logger.info("3. Place your medical research PDFs in the project root")
+        logger.info("4. Update pdf_files list with your actual PDF paths")
 
 def demo_basic():
     """Basic demo without PDFs for testing"""
-    print("🏥 Basic Medical Research AI Assistant Demo")
-    print("=" * 45)
+    logger.info("🏥 Basic Medical Research AI Assistant Demo")
+    logger.info("=" * 45)
     
     try:
         # Initialize RAG pipeline
@@ -97,22 +103,27 @@ def demo_basic():
         ]
         
         for query in queries:
-            print(f"\n🔍 Query: {query}")
+            logger.info("\n🔍 Query: %s", query)
             try:
                 result = pipeline.query(query)
-                print(f"📝 Answer: {result['answer'][:200]}...")
-                print(f"📊 Sources: {', '.join(result['sources'])}")
-                print(f"🧩 Found {result['chunks_found']} relevant chunks")
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("📝 Answer: %s...", result['answer'][:200])
+                    logger.info("📊 Sources: %s", ', '.join(result['sources']))
+                    logger.info("🧩 Found %s relevant chunks", result['chunks_found'])
             except Exception as e:
-                print(f"❌ Query error: {e}")
+                logger.error("❌ Query error: %s", e)
         
-        print("\n🎉 Basic demo complete!")
+        logger.info("\n🎉 Basic demo complete!")
         
     except Exception as e:
-        print(f"❌ Error: {e}")
-        print("\nℹ️  This demo requires existing documents in Qdrant")
+        logger.error("❌ Error: %s", e)
+        logger.info("\nℹ️  This demo requires existing documents in Qdrant")
 
 if __name__ == "__main__":
+    # Ingestion parses PDFs in worker processes (spawned on Windows/macOS)
+    multiprocessing.freeze_support()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    
     # Choose demo type
     demo_type = input("Choose demo:\n1. Multi-PDF async (requires PDFs)\n2. Basic (uses existing collection)\nEnter 1 or 2: ").strip()
     
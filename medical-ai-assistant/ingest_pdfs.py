@@ -6,6 +6,7 @@ Use this script to ingest your medical research PDFs into Qdrant
 import sys
 import os
 import asyncio
+import multiprocessing
 from pathlib import Path
 
 # Add src to path
@@ -86,4 +87,6 @@ async def ingest_medical_pdfs():
         print("3. Check PDF files are valid and readable")
 
 if __name__ == "__main__":
+    # Ingestion parses PDFs in worker processes (spawned on Windows/macOS)
+    multiprocessing.freeze_support()
     asyncio.run(ingest_medical_pdfs()) 
\ No newline at end of file
@@ -6,6 +6,8 @@ Execute comprehensive RAGAS evaluation on Medical RAG system
 import sys
 import os
 import asyncio
+import logging
+import numpy as np
 import pandas as pd
 from pathlib import Path
 from datetime import datetime
@@ -15,82 +17,88 @@ sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
 from rag.pipeline import get_rag_pipeline
 from evaluation.ragas_evaluator import get_ragas_evaluator
-from evaluation.test_datasets import get_test_dataset_generator
+from evaluation.test_datasets import TestCase, get_test_dataset_generator
+
+logger = logging.getLogger(__name__)
+logger.addHandler(logging.NullHandler())
 
 async def run_full_evaluation():
     """Run complete RAGAS evaluation pipeline"""
     
-    print("🏥 Medical AI Assistant - RAGAS Evaluation")
-    print("=" * 50)
+    logger.info("🏥 Medical AI Assistant - RAGAS Evaluation")
+    logger.info("=" * 50)
     
     try:
         # 1. Initialize components
-        print("\n🚀 Initializing components...")
+        logger.info("\n🚀 Initializing components...")
         pipeline = get_rag_pipeline()
         pipeline.setup_retriever()
         
         evaluator = get_ragas_evaluator()
         dataset_generator = get_test_dataset_generator()
         
-        print("✅ Components initialized successfully")
+        logger.info("✅ Components initialized successfully")
         
         # 2. Generate or load test dataset
-        print("\n📚 Preparing test dataset...")
+        logger.info("\n📚 Preparing test dataset...")
         
-        dataset_file = "data/ragas_test_dataset.json"
-        if os.path.exists(dataset_file):
-            print("📁 Loading existing test dataset...")
+        dataset_files = ["data/ragas_test_dataset.parquet", "data/ragas_test_dataset.ndjson"]
+        if any(os.path.exists(path) for path in dataset_files):
+            logger.info("📁 Loading existing test dataset...")
             test_cases = dataset_generator.load_test_dataset()
         else:
-            print("🧪 Generating new test dataset...")
-            test_cases = dataset_generator.create_test_dataset(pipeline, num_test_cases=10)
+            logger.info("🧪 Generating new test dataset...")
+            test_cases = await dataset_generator.create_test_dataset(pipeline, num_test_cases=10)
+            dataset_generator.save_test_dataset_parquet(test_cases)
+            # NDJSON copy kept for human inspection
             dataset_generator.save_test_dataset(test_cases)
         
         if not test_cases:
-            print("❌ No test cases available. Make sure you have ingested documents.")
+            logger.error("❌ No test cases available. Make sure you have ingested documents.")
             return
         
-        print(f"✅ Using {len(test_cases)} test cases for evaluation")
+        logger.info("✅ Using %s test cases for evaluation", len(test_cases))
         
         # 3. Run RAGAS evaluation
-        print("\n📊 Running RAGAS evaluation...")
+        logger.info("\n📊 Running RAGAS evaluation...")
         
-        results = await evaluator.evaluate_test_cases(test_cases)
+        results = await evaluator.evaluate_test_cases(test_cases, concurrency=8)
         
         # 4. Display results
-        print("\n🎯 RAGAS Evaluation Results")
-        print("=" * 30)
+        logger.info("\n🎯 RAGAS Evaluation Results")
+        logger.info("=" * 30)
         
-        for metric, score in results['metrics'].items():
-            print(f"{metric.replace('_', ' ').title()}: {score:.3f}")
+        if logger.isEnabledFor(logging.INFO):
+            for metric, score in results['metrics'].items():
+                logger.info("%s: %.3f", metric.replace('_', ' ').title(), score)
         
         # 5. Save detailed results
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        results_file = f"data/ragas_results_{timestamp}.json"
+        results_file = f"data/ragas_results_{timestamp}.ndjson"
         
-        await evaluator.save_results(results, results_file)
+        evaluator.save_results(results, results_file)
         
         # 6. Generate summary report
         generate_summary_report(results, test_cases)
         
-        print(f"\n💾 Results saved to: {results_file}")
-        print("🎉 RAGAS evaluation completed successfully!")
+        logger.info("\n💾 Results saved to: %s", results_file)
+        logger.info("🎉 RAGAS evaluation completed successfully!")
         
     except Exception as e:
-        print(f"❌ Error during evaluation: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ Error during evaluation: %s", e)
 
 def generate_summary_report(results, test_cases):
     """Generate human-readable summary report"""
     
-    print("\n📋 RAGAS Evaluation Summary")
-    print("=" * 40)
+    logger.info("\n📋 RAGAS Evaluation Summary")
+    logger.info("=" * 40)
     
-    metrics = results['metrics']
+    metrics = pd.Series(results['metrics'], dtype=float)
+    # Per-sample scores (one row per test case, one column per metric) when available
+    per_sample = pd.DataFrame(results.get('per_sample_metrics') or [])
     
     # Overall assessment
-    overall_score = sum(metrics.values()) / len(metrics)
+    overall_score = metrics.mean()
     
     if overall_score >= 0.8:
         assessment = "🟢 Excellent"
@@ -99,46 +107,49 @@ def generate_summary_report(results, test_cases):
     else:
         assessment = "🔴 Needs Improvement"
     
-    print(f"Overall Performance: {assessment} ({overall_score:.3f})")
-    print()
+    logger.info("Overall Performance: %s (%.3f)", assessment, overall_score)
+    logger.info("")
     
     # Individual metrics analysis
-    print("📊 Metric Breakdown:")
-    for metric, score in metrics.items():
-        if score >= 0.8:
-            status = "🟢"
-        elif score >= 0.6:
-            status = "🟡"
-        else:
-            status = "🔴"
-        
-        print(f"  {status} {metric.replace('_', ' ').title()}: {score:.3f}")
+    statuses = np.where(metrics.values >= 0.8, "🟢", np.where(metrics.values >= 0.6, "🟡", "🔴"))
+    
+    logger.info("📊 Metric Breakdown:")
+    if logger.isEnabledFor(logging.INFO):
+        for status, (metric, score) in zip(statuses, metrics.items()):
+            logger.info("  %s %s: %.3f", status, metric.replace('_', ' ').title(), score)
     
-    print()
+    if not per_sample.empty and logger.isEnabledFor(logging.INFO):
+        quantiles = per_sample.quantile([0.5, 0.9])
+        logger.info("")
+        logger.info("📐 Per-sample Distribution (p50 / p90):")
+        for metric in quantiles.columns:
+            logger.info("  %s: %.3f / %.3f", metric.replace('_', ' ').title(), quantiles.at[0.5, metric], quantiles.at[0.9, metric])
+    
+    logger.info("")
     
     # Recommendations
-    print("💡 Recommendations:")
+    logger.info("💡 Recommendations:")
     
     if metrics.get('faithfulness', 0) < 0.7:
-        print("  • Improve context relevance - consider better chunking strategies")
+        logger.info("  • Improve context relevance - consider better chunking strategies")
     
     if metrics.get('answer_relevancy', 0) < 0.7:
-        print("  • Enhance answer generation - review prompts and LLM parameters")
+        logger.info("  • Enhance answer generation - review prompts and LLM parameters")
     
     if metrics.get('context_precision', 0) < 0.7:
-        print("  • Optimize retrieval - adjust embedding model or similarity thresholds")
+        logger.info("  • Optimize retrieval - adjust embedding model or similarity thresholds")
     
     if metrics.get('context_recall', 0) < 0.7:
-        print("  • Increase context coverage - consider retrieving more documents")
+        logger.info("  • Increase context coverage - consider retrieving more documents")
     
-    print(f"\n📈 Tested on {len(test_cases)} medical research questions")
-    print("🔄 Run regularly to monitor system performance")
+    logger.info("\n📈 Tested on %s medical research questions", len(test_cases))
+    logger.info("🔄 Run regularly to monitor system performance")
 
-def run_quick_evaluation():
+async def run_quick_evaluation():
     """Run quick evaluation with fewer test cases"""
     
-    print("🏥 Medical AI Assistant - Quick RAGAS Evaluation")
-    print("=" * 50)
+    logger.info("🏥 Medical AI Assistant - Quick RAGAS Evaluation")
+    logger.info("=" * 50)
     
     try:
         # Initialize
@@ -153,49 +164,74 @@ def run_quick_evaluation():
             "What were the key limitations in the studies?"
         ]
         
-        print(f"\n🧪 Testing {len(quick_test_questions)} sample questions...")
+        logger.info("\n🧪 Testing %s sample questions...", len(quick_test_questions))
+        
+        # Cap in-flight queries to stay under Gemini rate limits
+        semaphore = asyncio.Semaphore(4)
+        
+        async def _bounded(question):
+            async with semaphore:
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("🔍 Testing: %s...", question[:50])
+                return await pipeline.query_async(question)
+        
+        responses = await asyncio.gather(*[_bounded(q) for q in quick_test_questions])
+        
+        # Without ground truth each answer stands in as its own reference
+        test_cases = [
+            TestCase(
+                question=question,
+                ground_truth=result['answer'],
+                contexts=[chunk.page_content for chunk in result['chunks']],
+                answer=result['answer']
+            )
+            for question, result in zip(quick_test_questions, responses)
+        ]
+        sources = {question: result.get('sources', []) for question, result in zip(quick_test_questions, responses)}
+        
+        evaluation = await evaluator.evaluate_test_cases(test_cases, concurrency=4)
         
         results = []
-        for question in quick_test_questions:
-            print(f"🔍 Testing: {question[:50]}...")
-            
-            # Get answer
-            result = pipeline.query(question)
-            
-            # Simple evaluation (without ground truth)
-            score = evaluator.quick_evaluate(question, result['answer'], result['context'])
-            
+        for detail in evaluation['detailed_results']:
+            # Per-question score: mean of the metrics RAGAS could compute
+            scores = [v for v in detail['individual_scores'].values() if not np.isnan(v)]
             results.append({
-                'question': question,
-                'answer': result['answer'],
-                'score': score,
-                'sources': result.get('sources', [])
+                'question': detail['question'],
+                'answer': detail['answer'],
+                'score': sum(scores) / len(scores) if scores else 0.0,
+                'sources': sources[detail['question']]
             })
         
+        if not results:
+            logger.error("❌ No questions could be evaluated. Make sure you have ingested documents.")
+            return
+        
         # Display results
         avg_score = sum(r['score'] for r in results) / len(results)
         
-        print(f"\n📊 Quick Evaluation Results")
-        print(f"Average Score: {avg_score:.3f}")
+        logger.info("\n📊 Quick Evaluation Results")
+        logger.info("Average Score: %.3f", avg_score)
         
-        for i, result in enumerate(results, 1):
-            print(f"\n{i}. Question: {result['question'][:60]}...")
-            print(f"   Score: {result['score']:.3f}")
-            print(f"   Sources: {', '.join(result['sources'])}")
+        if logger.isEnabledFor(logging.INFO):
+            for i, result in enumerate(results, 1):
+                logger.info("\n%s. Question: %s...", i, result['question'][:60])
+                logger.info("   Score: %.3f", result['score'])
+                logger.info("   Sources: %s", ', '.join(result['sources']))
         
-        print("\n💡 For comprehensive evaluation, run: python run_ragas_evaluation.py --full")
+        logger.info("\n💡 For comprehensive evaluation, run: python run_ragas_evaluation.py --full")
         
     except Exception as e:
-        print(f"❌ Error during quick evaluation: {e}")
+        logger.error("❌ Error during quick evaluation: %s", e)
 
 def main():
     """Main entry point"""
     
     # Check command line arguments
     if len(sys.argv) > 1 and sys.argv[1] == "--quick":
-        run_quick_evaluation()
+        asyncio.run(run_quick_evaluation())
     else:
         asyncio.run(run_full_evaluation())
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
     main() 
\ No newline at end of file
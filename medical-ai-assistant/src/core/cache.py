@@ -0,0 +1,169 @@
+"""
+Response caching for Gemini chat calls
+Exact-match TTL cache, on-disk cache across runs, plus a cosine-similarity semantic cache
+"""
+
+import time
+import asyncio
+import hashlib
+import inspect
+import threading
+import functools
+import numpy as np
+from collections import OrderedDict
+from typing import Any, Callable, List, Optional, Tuple
+
+def cache_key(*parts: Optional[str]) -> str:
+    """Stable sha256 key for a sequence of prompt parts"""
+    return hashlib.sha256("\x00".join(part or "" for part in parts).encode("utf-8")).hexdigest()
+
+class TTLCache:
+    """Bounded LRU of key -> value whose entries expire after ttl seconds"""
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        # Shared by to_thread workers and concurrent Streamlit script threads
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry[0] >= self.ttl:
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any):
+        with self._lock:
+            self._data[key] = (time.time(), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+class _Scope:
+    """Fixed-capacity ring of normalized vectors and their answers"""
+
+    def __init__(self, dim: int, capacity: int):
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.entries: List[Optional[Tuple[float, str]]] = [None] * capacity
+        self.count = 0
+
+    def add(self, vector: np.ndarray, answer: str):
+        # Overwrites the oldest entry once full; no reallocation per insert
+        slot = self.count % len(self.entries)
+        self.vectors[slot] = vector
+        self.entries[slot] = (time.time(), answer)
+        self.count += 1
+
+class SemanticCache:
+    """Answer cache keyed on normalized query embeddings (inner product == cosine)"""
+
+    def __init__(self, embed_fn: Callable[[str], List[float]], threshold: float = 0.95, ttl: float = 6 * 3600,
+                 max_entries: int = 256, max_scopes: int = 64):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_scopes = max_scopes
+        # Entries are scoped by system prompt so answers never cross contexts;
+        # least recently used scopes are dropped beyond max_scopes
+        self._scopes: "OrderedDict[str, _Scope]" = OrderedDict()
+
+    def embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn(query), dtype=np.float32)
+        return vector / (np.linalg.norm(vector) or 1.0)
+
+    def lookup(self, vector: np.ndarray, scope: str) -> Optional[str]:
+        """Return the closest cached answer above the similarity threshold"""
+        entries = self._scopes.get(scope)
+        if entries is None:
+            return None
+        self._scopes.move_to_end(scope)
+
+        size = min(entries.count, len(entries.entries))
+        scores = entries.vectors[:size] @ vector
+        best = int(np.argmax(scores))
+        created, answer = entries.entries[best]
+        if scores[best] > self.threshold and time.time() - created < self.ttl:
+            return answer
+        return None
+
+    def add(self, vector: np.ndarray, answer: str, scope: str):
+        entries = self._scopes.get(scope)
+        if entries is None:
+            entries = self._scopes[scope] = _Scope(vector.shape[0], self.max_entries)
+            while len(self._scopes) > self.max_scopes:
+                self._scopes.popitem(last=False)
+        self._scopes.move_to_end(scope)
+        entries.add(vector, answer)
+
+def _lookup(client, query: str, system_prompt: Optional[str]):
+    """Return (key, scope, query vector, cached answer or None) for a chat call"""
+    key = cache_key(system_prompt, query)
+    
+    # Tier 1: exact match
+    answer = client._exact.get(key)
+    if answer is not None:
+        return key, None, None, answer
+    
+    # Tier 2: persisted answer from an earlier run with the same model
+    if client._disk is not None:
+        answer = client._disk.get(_disk_key(client, key))
+        if answer is not None:
+            client._exact.set(key, answer)
+            return key, None, None, answer
+    
+    # Tier 3: semantically similar query under the same system prompt
+    scope = cache_key(system_prompt)
+    vector = None
+    if client._semantic is not None:
+        try:
+            vector = client._semantic.embed(query)
+            answer = client._semantic.lookup(vector, scope)
+            if answer is not None:
+                client._exact.set(key, answer)
+                return key, scope, vector, answer
+        except Exception as e:
+            print(f"⚠️ Semantic cache lookup failed: {e}")
+            vector = None
+    return key, scope, vector, None
+
+def _disk_key(client, key: str) -> str:
+    # Model is part of the key so switching models never replays stale answers
+    return cache_key(client.settings.gemini_model, key)
+
+def _store(client, key: str, scope: str, vector: Optional[np.ndarray], answer: str):
+    client._exact.set(key, answer)
+    if client._disk is not None:
+        # Persisted answers expire with the same TTL as the in-memory tier
+        client._disk.set(_disk_key(client, key), answer, expire=client._exact.ttl)
+    if vector is not None:
+        client._semantic.add(vector, answer, scope)
+
+def cached(func):
+    """Cache a chat(query, system_prompt) method: exact match, then disk, then semantic"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, query: str, system_prompt: str = None) -> str:
+            # The semantic lookup embeds the query, a blocking network call
+            key, scope, vector, answer = await asyncio.to_thread(_lookup, self, query, system_prompt)
+            if answer is None:
+                answer = await func(self, query, system_prompt)
+                # The disk tier is a SQLite write; keep it off the event loop
+                await asyncio.to_thread(_store, self, key, scope, vector, answer)
+            return answer
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(self, query: str, system_prompt: str = None) -> str:
+        key, scope, vector, answer = _lookup(self, query, system_prompt)
+        if answer is None:
+            answer = func(self, query, system_prompt)
+            _store(self, key, scope, vector, answer)
+        return answer
+    return wrapper
@@ -1,19 +1,36 @@
 import os
+from dataclasses import dataclass
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@dataclass(frozen=True, slots=True)
 class Settings:
-    def __init__(self):
-        self.gemini_api_key = os.getenv("GEMINI_API_KEY")
-        self.gemini_model = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
-        self.qdrant_url = os.getenv("QDRANT_URL", "http://localhost:6333")
-        self.collection_name = os.getenv("COLLECTION_NAME", "medical_documents")
-        
+    gemini_api_key: str = os.getenv("GEMINI_API_KEY")
+    gemini_model: str = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+    qdrant_url: str = os.getenv("QDRANT_URL", "http://localhost:6333")
+    qdrant_grpc_port: int = int(os.getenv("QDRANT_GRPC_PORT", "6334"))
+    collection_name: str = os.getenv("COLLECTION_NAME", "medical_documents")
+    # HNSW beam width at query time; higher trades latency for recall
+    hnsw_ef: int = int(os.getenv("HNSW_EF", "64"))
+    # Vector quantization for new collections: "int8" or "none"
+    quantization: str = os.getenv("QDRANT_QUANT", "int8")
+    # Max Gemini requests in flight during evaluation dataset generation
+    gemini_concurrency: int = int(os.getenv("GEMINI_CONCURRENCY", "8"))
+    # Parallel RAGAS metric workers for batched evaluate() calls
+    ragas_workers: int = int(os.getenv("RAGAS_WORKERS", "16"))
+    # Cosine similarity needed to reuse a cached answer; 1 (default) disables the
+    # semantic cache, since near-identical prompt templates can match across contexts
+    semantic_cache_threshold: float = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "1"))
+    # Persist chat answers under data/llm_cache so evaluation reruns skip Gemini;
+    # opt-in with RAGAS_CACHE=1
+    llm_disk_cache: bool = os.getenv("RAGAS_CACHE", "0") == "1"
+
+    def __post_init__(self):
         if not self.gemini_api_key:
             raise ValueError("Please set GEMINI_API_KEY in your .env file")
 
-settings = Settings()
-
-def get_settings():
-    return settings 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    return Settings()
@@ -1,30 +1,85 @@
+import io
+import diskcache
+from typing import Iterator
 import google.generativeai as genai
+from langchain_google_genai import GoogleGenerativeAIEmbeddings
 from .config import get_settings
+from .cache import SemanticCache, TTLCache, _lookup, _store, cached
+from .singleton import LazySingleton
+
+MEDICAL_PROMPT = """You are a AI Assistant for healthcare professionals. 
+Provide accurate, evidence-based information based on the provided context. 
+Always note that responses are for informational purposes only."""
+
+# Cached answers expire after 6 hours; at most this many kept in memory
+CACHE_TTL = 6 * 3600
+EXACT_CACHE_SIZE = 4096
+# On-disk answer cache shared across runs
+LLM_CACHE_DIR = "data/llm_cache"
+
+_configured = False
+
+def _configure(api_key: str):
+    """Apply the global genai configuration once per process"""
+    global _configured
+    if not _configured:
+        genai.configure(api_key=api_key)
+        _configured = True
 
 class GeminiClient:
     def __init__(self):
         self.settings = get_settings()
-        genai.configure(api_key=self.settings.gemini_api_key)
+        _configure(self.settings.gemini_api_key)
         self.model = genai.GenerativeModel(self.settings.gemini_model)
+        
+        # Response caches: bounded exact-match LRU, plus optional semantic lookup
+        self._exact = TTLCache(EXACT_CACHE_SIZE, CACHE_TTL)
+        self._semantic = SemanticCache(
+            GoogleGenerativeAIEmbeddings(
+                model="models/embedding-001",
+                google_api_key=self.settings.gemini_api_key
+            ).embed_query,
+            threshold=self.settings.semantic_cache_threshold,
+            ttl=CACHE_TTL
+        ) if self.settings.semantic_cache_threshold < 1 else None
+        self._disk = diskcache.Cache(LLM_CACHE_DIR) if self.settings.llm_disk_cache else None
     
-    def chat(self, query: str, system_prompt: str = None) -> str:
+    def _model_for(self, system_prompt: str = None):
+        """Pick the model carrying the given system prompt as its instruction"""
         if system_prompt:
-            prompt = f"{system_prompt}\n\nUser: {query}\nAssistant:"
-        else:
-            prompt = query
-        
-        response = self.model.generate_content(prompt)
+            # Per-query prompts (e.g. retrieved context) go in as the system instruction
+            return genai.GenerativeModel(self.settings.gemini_model, system_instruction=system_prompt)
+        return self.model
+    
+    @cached
+    def chat(self, query: str, system_prompt: str = None) -> str:
+        response = self._model_for(system_prompt).generate_content(query)
+        return response.text
+    
+    @cached
+    async def achat(self, query: str, system_prompt: str = None) -> str:
+        """Async chat using the native async client instead of a worker thread"""
+        response = await self._model_for(system_prompt).generate_content_async(query)
         return response.text
     
+    def chat_stream(self, query: str, system_prompt: str = None) -> Iterator[str]:
+        """Yield the answer as it is generated; the full text is cached like chat"""
+        # Same cache tiers as chat, so every entry point sees the same answers
+        key, scope, vector, answer = _lookup(self, query, system_prompt)
+        if answer is not None:
+            yield answer
+            return
+        
+        buffer = io.StringIO()
+        for chunk in self._model_for(system_prompt).generate_content(query, stream=True):
+            buffer.write(chunk.text)
+            yield chunk.text
+        _store(self, key, scope, vector, buffer.getvalue())
+    
     def get_medical_prompt(self) -> str:
-        return """You are a AI Assistant for healthcare professionals. 
-Provide accurate, evidence-based information based on the provided context. 
-Always note that responses are for informational purposes only."""
+        return MEDICAL_PROMPT
 
-_client = None
+_client = LazySingleton(GeminiClient)
 
 def get_gemini_client():
-    global _client
-    if _client is None:
-        _client = GeminiClient()
-    return _client 
\ No newline at end of file
+    return _client.get()
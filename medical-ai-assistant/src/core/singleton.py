@@ -0,0 +1,30 @@
+"""
+Lazily built process-wide instances shared by the module-level get_* accessors
+"""
+
+import threading
+from typing import Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+class LazySingleton(Generic[T]):
+    """Build one instance on first use, even under concurrent first calls"""
+    
+    def __init__(self, factory: Callable[[], T]):
+        self._factory = factory
+        self._instance: Optional[T] = None
+        self._lock = threading.Lock()
+    
+    def get(self) -> T:
+        """Return the instance, building it on the first call"""
+        # Double-checked so only the first calls ever take the lock
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+        return self._instance
+    
+    def reset(self):
+        """Drop the instance so the next get builds a fresh one"""
+        with self._lock:
+            self._instance = None
@@ -1,4 +1,4 @@
-from .ragas_evaluator import get_ragas_evaluator
+from .ragas_evaluator import get_ragas_evaluator, reset_ragas_evaluator
 from .test_datasets import get_test_dataset_generator, TestCase
 
-__all__ = ['get_ragas_evaluator', 'get_test_dataset_generator', 'TestCase'] 
\ No newline at end of file
+__all__ = ['get_ragas_evaluator', 'reset_ragas_evaluator', 'get_test_dataset_generator', 'TestCase'] 
\ No newline at end of file
@@ -3,14 +3,19 @@ RAGAS Evaluation Framework for Medical AI Assistant
 Evaluates RAG pipeline quality using faithfulness, relevancy, precision, and recall metrics
 """
 
+import io
+import os
 import asyncio
+import orjson
 import pandas as pd
-from typing import List, Dict, Any
-import json
+from pathlib import Path
+from typing import Iterator, List, Dict, Any
 from datetime import datetime
+from aiolimiter import AsyncLimiter
 from datasets import Dataset
 
 from ragas import evaluate
+from ragas.run_config import RunConfig
 from ragas.metrics import (
     faithfulness,
     answer_relevancy, 
@@ -22,7 +27,9 @@ from ragas.metrics import (
 
 from langchain_google_genai import ChatGoogleGenerativeAI
 from core.config import get_settings
+from core.singleton import LazySingleton
 from rag.pipeline import get_rag_pipeline
+from evaluation.test_datasets import TestCase
 
 class RAGASEvaluator:
     def __init__(self):
@@ -46,9 +53,12 @@ class RAGASEvaluator:
             answer_similarity       # Semantic similarity
         ]
         
+        # Let RAGAS schedule metric LLM calls in parallel across the whole dataset
+        self.run_config = RunConfig(max_workers=self.settings.ragas_workers, max_wait=60)
+        
         self.evaluation_results = []
 
-    def create_test_dataset(self, questions: List[str], ground_truth_answers: List[str] = None) -> Dict:
+    async def create_test_dataset(self, questions: List[str], ground_truth_answers: List[str] = None) -> Dict:
         """
         Create evaluation dataset by running queries through RAG pipeline
         
@@ -68,33 +78,44 @@ class RAGASEvaluator:
             'ground_truth': []
         }
         
-        for i, question in enumerate(questions):
-            print(f"Processing question {i+1}/{len(questions)}: {question[:60]}...")
-            
-            try:
-                # Get RAG response
-                result = self.pipeline.query(question, k=4)
-                
-                dataset['question'].append(question)
-                dataset['answer'].append(result['answer'])
-                
-                # Extract contexts from retrieved chunks
-                contexts = []
-                for chunk in self.pipeline.search_documents(question, k=4):
-                    contexts.append(chunk.page_content)
-                dataset['contexts'].append(contexts)
-                
-                # Use ground truth if provided, otherwise use a placeholder
-                if ground_truth_answers and i < len(ground_truth_answers):
-                    dataset['ground_truth'].append(ground_truth_answers[i])
-                else:
-                    # For medical research, we'll use the answer as proxy ground truth
-                    # In real scenarios, you'd have expert-curated ground truth
-                    dataset['ground_truth'].append(result['answer'])
-                    
-            except Exception as e:
-                print(f"❌ Error processing question {i+1}: {e}")
+        # Retrieve chunks for every question in one batched search
+        try:
+            chunks_per_question = await asyncio.to_thread(self.pipeline.search_documents_many, questions, 4)
+        except Exception as e:
+            print(f"⚠️ Batched search failed, searching per question: {e}")
+            chunks_per_question = [None] * len(questions)
+        
+        # All questions run concurrently, capped to stay under Gemini rate limits
+        semaphore = asyncio.Semaphore(8)
+        
+        async def _one(i: int, question: str):
+            async with semaphore:
+                print(f"Processing question {i+1}/{len(questions)}: {question[:60]}...")
+                try:
+                    return await asyncio.to_thread(self.pipeline.query, question, 4, chunks_per_question[i])
+                except Exception as e:
+                    print(f"❌ Error processing question {i+1}: {e}")
+                    return None
+        
+        results = await asyncio.gather(*[_one(i, q) for i, q in enumerate(questions)])
+        
+        for i, (question, result) in enumerate(zip(questions, results)):
+            if result is None:
                 continue
+            
+            dataset['question'].append(question)
+            dataset['answer'].append(result['answer'])
+            
+            # Extract contexts from the chunks the answer was generated from
+            dataset['contexts'].append([chunk.page_content for chunk in result['chunks']])
+            
+            # Use ground truth if provided, otherwise use a placeholder
+            if ground_truth_answers and i < len(ground_truth_answers):
+                dataset['ground_truth'].append(ground_truth_answers[i])
+            else:
+                # For medical research, we'll use the answer as proxy ground truth
+                # In real scenarios, you'd have expert-curated ground truth
+                dataset['ground_truth'].append(result['answer'])
         
         print(f"✅ Created dataset with {len(dataset['question'])} samples")
         return dataset
@@ -113,7 +134,7 @@ class RAGASEvaluator:
         print("🧪 Starting RAGAS Evaluation...")
         
         # Create test dataset
-        dataset_dict = self.create_test_dataset(test_questions, ground_truth_answers)
+        dataset_dict = await self.create_test_dataset(test_questions, ground_truth_answers)
         
         if not dataset_dict['question']:
             raise ValueError("No valid data generated for evaluation")
@@ -130,6 +151,7 @@ class RAGASEvaluator:
                 metrics=self.metrics,
                 llm=self.evaluator_llm,
                 embeddings=self.pipeline.embedding_model,
+                run_config=self.run_config,
             )
             
             # Process results
@@ -140,22 +162,19 @@ class RAGASEvaluator:
                 'detailed_results': []
             }
             
-            # Add detailed per-question results
-            for i, question in enumerate(test_questions):
-                if i < len(dataset_dict['question']):
-                    detailed_result = {
-                        'question': question,
-                        'answer': dataset_dict['answer'][i],
-                        'contexts_count': len(dataset_dict['contexts'][i]),
-                        'individual_scores': {}
-                    }
-                    
-                    # Extract individual scores for this question
-                    for metric_name in result.keys():
-                        if hasattr(result, metric_name) and len(getattr(result, metric_name, [])) > i:
-                            detailed_result['individual_scores'][metric_name] = getattr(result, metric_name)[i]
-                    
-                    evaluation_results['detailed_results'].append(detailed_result)
+            # Per-question scores: the Result itself only holds aggregate means
+            scores_df = result.to_pandas()
+            metric_names = [metric.name for metric in self.metrics if metric.name in scores_df.columns]
+            
+            # Add detailed per-question results; rows follow dataset_dict, which
+            # skips questions whose query failed
+            for i, row in enumerate(scores_df[metric_names].to_dict("records")):
+                evaluation_results['detailed_results'].append({
+                    'question': dataset_dict['question'][i],
+                    'answer': dataset_dict['answer'][i],
+                    'contexts_count': len(dataset_dict['contexts'][i]),
+                    'individual_scores': {name: float(value) for name, value in row.items()}
+                })
             
             self.evaluation_results.append(evaluation_results)
             
@@ -166,10 +185,90 @@ class RAGASEvaluator:
             print(f"❌ Error during RAGAS evaluation: {e}")
             raise
 
+    def _evaluate_one(self, test_case: TestCase) -> Dict[str, float]:
+        """Score a single test case with all RAGAS metrics"""
+        dataset = Dataset.from_dict({
+            'question': [test_case.question],
+            'answer': [test_case.answer],
+            'contexts': [test_case.contexts],
+            'ground_truth': [test_case.ground_truth]
+        })
+        
+        result = evaluate(
+            dataset=dataset,
+            metrics=self.metrics,
+            llm=self.evaluator_llm,
+            embeddings=self.pipeline.embedding_model,
+        )
+        
+        row = result.to_pandas().iloc[0]
+        return {metric.name: float(row[metric.name]) for metric in self.metrics if metric.name in row}
+
+    async def evaluate_test_cases(self, test_cases: List[TestCase], concurrency: int = 8, max_rate: int = 60) -> Dict:
+        """
+        Evaluate pre-built test cases with a pool of worker coroutines
+        
+        Args:
+            test_cases: Test cases with answers, contexts and ground truth
+            concurrency: Number of test cases scored at once
+            max_rate: Maximum metric LLM calls per minute across all workers
+            
+        Returns:
+            Evaluation results with aggregate and per-sample metrics
+        """
+        print(f"📊 Evaluating {len(test_cases)} test cases with {concurrency} workers...")
+        
+        # Token bucket paced by metric calls, since each metric is one LLM request
+        limiter = AsyncLimiter(max_rate=max_rate, time_period=60)
+        queue = asyncio.Queue()
+        for i, test_case in enumerate(test_cases):
+            queue.put_nowait((i, test_case))
+        
+        scores = [None] * len(test_cases)
+        
+        async def _worker():
+            while not queue.empty():
+                i, test_case = queue.get_nowait()
+                await limiter.acquire(min(len(self.metrics), max_rate))
+                try:
+                    scores[i] = await asyncio.to_thread(self._evaluate_one, test_case)
+                except Exception as e:
+                    print(f"❌ Error evaluating test case {i+1}: {e}")
+        
+        await asyncio.gather(*[_worker() for _ in range(min(concurrency, len(test_cases)))])
+        
+        evaluated = [(tc, score) for tc, score in zip(test_cases, scores) if score is not None]
+        if not evaluated:
+            raise ValueError("No test cases could be evaluated")
+        
+        per_sample_metrics = [score for _, score in evaluated]
+        evaluation_results = {
+            'timestamp': datetime.now().isoformat(),
+            'num_questions': len(test_cases),
+            'metrics': pd.DataFrame(per_sample_metrics).mean().to_dict(),
+            'per_sample_metrics': per_sample_metrics,
+            'detailed_results': [
+                {
+                    'question': tc.question,
+                    'answer': tc.answer,
+                    'contexts_count': len(tc.contexts),
+                    'individual_scores': score
+                }
+                for tc, score in evaluated
+            ]
+        }
+        
+        self.evaluation_results.append(evaluation_results)
+        
+        print("✅ RAGAS evaluation completed!")
+        return evaluation_results
+
     def generate_evaluation_report(self, results: Dict) -> str:
         """Generate a formatted evaluation report"""
         
-        report = f"""
+        report = io.StringIO()
+        write = report.write
+        write(f"""
 # 🏥 Medical AI Assistant - RAGAS Evaluation Report
 
 **Evaluation Date:** {results['timestamp']}
@@ -177,13 +276,13 @@ class RAGASEvaluator:
 
 ## 📊 Overall Metrics
 
-"""
+""")
         
         for metric_name, score in results['metrics'].items():
             if isinstance(score, (int, float)):
-                report += f"- **{metric_name.replace('_', ' ').title()}:** {score:.4f}\n"
+                write(f"- **{metric_name.replace('_', ' ').title()}:** {score:.4f}\n")
         
-        report += """
+        write("""
 ## 📈 Metric Explanations
 
 - **Faithfulness:** Measures if the answer is grounded in the given context (0-1, higher is better)
@@ -195,7 +294,7 @@ class RAGASEvaluator:
 
 ## 🎯 Performance Analysis
 
-"""
+""")
         
         # Performance analysis
         metrics = results['metrics']
@@ -203,75 +302,104 @@ class RAGASEvaluator:
         if 'faithfulness' in metrics:
             faithfulness_score = metrics['faithfulness']
             if faithfulness_score >= 0.8:
-                report += "✅ **Excellent Faithfulness:** Answers are well-grounded in source documents\n"
+                write("✅ **Excellent Faithfulness:** Answers are well-grounded in source documents\n")
             elif faithfulness_score >= 0.6:
-                report += "⚠️ **Good Faithfulness:** Most answers are grounded, some improvement possible\n"
+                write("⚠️ **Good Faithfulness:** Most answers are grounded, some improvement possible\n")
             else:
-                report += "❌ **Poor Faithfulness:** Answers may contain hallucinations\n"
+                write("❌ **Poor Faithfulness:** Answers may contain hallucinations\n")
         
         if 'answer_relevancy' in metrics:
             relevancy_score = metrics['answer_relevancy']
             if relevancy_score >= 0.8:
-                report += "✅ **Excellent Relevancy:** Answers directly address the questions\n"
+                write("✅ **Excellent Relevancy:** Answers directly address the questions\n")
             elif relevancy_score >= 0.6:
-                report += "⚠️ **Good Relevancy:** Answers are mostly relevant\n"
+                write("⚠️ **Good Relevancy:** Answers are mostly relevant\n")
             else:
-                report += "❌ **Poor Relevancy:** Answers may be off-topic\n"
+                write("❌ **Poor Relevancy:** Answers may be off-topic\n")
         
         if 'context_precision' in metrics:
             precision_score = metrics['context_precision']
             if precision_score >= 0.8:
-                report += "✅ **Excellent Context Precision:** Retrieved contexts are highly relevant\n"
+                write("✅ **Excellent Context Precision:** Retrieved contexts are highly relevant\n")
             elif precision_score >= 0.6:
-                report += "⚠️ **Good Context Precision:** Most retrieved contexts are relevant\n"
+                write("⚠️ **Good Context Precision:** Most retrieved contexts are relevant\n")
             else:
-                report += "❌ **Poor Context Precision:** Too much irrelevant context retrieved\n"
+                write("❌ **Poor Context Precision:** Too much irrelevant context retrieved\n")
         
         if 'context_recall' in metrics:
             recall_score = metrics['context_recall']
             if recall_score >= 0.8:
-                report += "✅ **Excellent Context Recall:** System finds most relevant information\n"
+                write("✅ **Excellent Context Recall:** System finds most relevant information\n")
             elif recall_score >= 0.6:
-                report += "⚠️ **Good Context Recall:** System finds most relevant information\n"
+                write("⚠️ **Good Context Recall:** System finds most relevant information\n")
             else:
-                report += "❌ **Poor Context Recall:** System misses important relevant information\n"
+                write("❌ **Poor Context Recall:** System misses important relevant information\n")
         
-        report += """
+        write("""
 ## 💡 Recommendations
 
-"""
+""")
         
         # Generate recommendations based on scores
         if metrics.get('faithfulness', 1) < 0.7:
-            report += "- Improve prompt engineering to reduce hallucinations\n"
-            report += "- Consider adjusting retrieval parameters\n"
+            write("- Improve prompt engineering to reduce hallucinations\n")
+            write("- Consider adjusting retrieval parameters\n")
         
         if metrics.get('context_precision', 1) < 0.7:
-            report += "- Improve document chunking strategy\n"
-            report += "- Tune similarity search parameters\n"
+            write("- Improve document chunking strategy\n")
+            write("- Tune similarity search parameters\n")
         
         if metrics.get('context_recall', 1) < 0.7:
-            report += "- Increase number of retrieved documents (k parameter)\n"
-            report += "- Improve embedding model or similarity metric\n"
+            write("- Increase number of retrieved documents (k parameter)\n")
+            write("- Improve embedding model or similarity metric\n")
         
         if metrics.get('answer_relevancy', 1) < 0.7:
-            report += "- Refine system prompts for better question answering\n"
-            report += "- Improve question understanding and context utilization\n"
+            write("- Refine system prompts for better question answering\n")
+            write("- Improve question understanding and context utilization\n")
         
-        report += "\n---\n*Report generated by RAGAS Evaluation Framework*"
+        write("\n---\n*Report generated by RAGAS Evaluation Framework*")
         
-        return report
+        return report.getvalue()
 
     def save_results(self, results: Dict, filename: str = None):
-        """Save evaluation results to file"""
+        """Save evaluation results as NDJSON: a summary line, then one line per question"""
         if filename is None:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"ragas_evaluation_{timestamp}.json"
-        
-        with open(filename, 'w') as f:
-            json.dump(results, f, indent=2, default=str)
+            filename = f"ragas_evaluation_{timestamp}.ndjson"
+        
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        summary = {key: value for key, value in results.items() if key != 'detailed_results'}
+        
+        # Write to a temp file and swap it in so a crash never leaves partial JSON;
+        # records are serialized one at a time instead of as one big document
+        filepath = Path(filename)
+        tmp_path = filepath.with_suffix(filepath.suffix + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(summary, default=str, option=option))
+            f.write(b"\n")
+            for detailed_result in results.get('detailed_results', []):
+                f.write(orjson.dumps(detailed_result, default=str, option=option))
+                f.write(b"\n")
+        os.replace(tmp_path, filepath)
         
         print(f"💾 Results saved to {filename}")
+    
+    def load_results(self, filename: str) -> Iterator[Dict]:
+        """Lazily yield saved results: the summary first, then each detailed result"""
+        with open(filename, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
+
+# Global evaluator instance
+_evaluator = LazySingleton(RAGASEvaluator)
+
+def get_ragas_evaluator():
+    return _evaluator.get()
+
+def reset_ragas_evaluator():
+    """Drop the global evaluator so it is rebuilt around a fresh pipeline"""
+    _evaluator.reset()
 
 def get_medical_test_questions():
     """Get predefined medical research test questions"""
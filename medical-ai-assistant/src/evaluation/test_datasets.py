@@ -3,12 +3,46 @@ RAGAS Test Dataset Generation
 Generate test questions and ground truth for evaluation
 """
 
+import os
+import re
 import json
 import asyncio
-from typing import List, Dict, Any
+import orjson
+import pandas as pd
+from typing import Iterator, List, Dict, Any, Tuple
 from pathlib import Path
 from dataclasses import dataclass
+from core.config import get_settings
 from core.gemini_client import get_gemini_client
+from core.singleton import LazySingleton
+
+# Leading list numbering such as "1." or "2)" in generated questions
+_NUM_RE = re.compile(r'^\s*\d+[.)\-:]\s*')
+
+# Sample queries used to pull diverse contexts for test cases
+SAMPLE_QUERIES = [
+    "diabetes treatment approaches",
+    "cardiovascular medication side effects",
+    "hypertension management protocols",
+    "clinical trial methodologies",
+    "patient safety considerations",
+    "drug interactions and contraindications",
+    "therapeutic effectiveness measures",
+    "adverse events reporting"
+]
+
+# Questions answered per batched ground-truth call
+GROUND_TRUTH_BATCH_SIZE = 8
+
+def _iter_records(filepath: Path) -> Iterator[Dict[str, Any]]:
+    """Lazily yield records from an NDJSON file, or from a legacy JSON array"""
+    if filepath.suffix == ".json":
+        yield from orjson.loads(filepath.read_bytes())
+        return
+    with open(filepath, 'rb') as f:
+        for line in f:
+            if line.strip():
+                yield orjson.loads(line)
 
 @dataclass
 class TestCase:
@@ -48,10 +82,10 @@ class TestDatasetGenerator:
             questions = []
             
             for line in response.split('\n'):
-                line = line.strip()
-                if line and any(char.isdigit() for char in line[:3]):
+                match = _NUM_RE.match(line)
+                if match:
                     # Remove numbering and clean up
-                    question = line.split('.', 1)[-1].strip()
+                    question = line[match.end():].strip()
                     if question and len(question) > 10:
                         questions.append(question)
             
@@ -90,114 +124,239 @@ class TestDatasetGenerator:
             print(f"Error generating ground truth: {e}")
             return "Unable to generate ground truth answer."
     
-    def create_test_dataset(self, pipeline, num_test_cases: int = 10) -> List[TestCase]:
-        """Create a complete test dataset"""
+    def generate_ground_truth_batch(self, items: List[Tuple[str, List[str]]]) -> List[str]:
+        """Generate ground truth answers for several (question, contexts) pairs in one call"""
+        
+        if len(items) == 1:
+            return [self.generate_ground_truth(*items[0])]
+        
+        payload = json.dumps(
+            [{'id': i, 'question': question, 'contexts': contexts} for i, (question, contexts) in enumerate(items)],
+            ensure_ascii=False
+        )
+        
+        prompt = f"""
+        Answer each question using ONLY its own medical research contexts.
+        
+        Items:
+        {payload}
+        
+        Instructions:
+        - Answer only based on the item's own contexts
+        - Be specific and factual
+        - If the contexts don't contain enough information, state that clearly
+        - Focus on medical accuracy
+        - Keep answers concise but complete
+        
+        Return only JSON: [{{"id": <id>, "answer": "<answer>"}}, ...]
+        """
+        
+        try:
+            response = self.gemini_client.chat(prompt).strip()
+            # Drop a ```json fence if the model added one
+            if response.startswith("```"):
+                response = response.split("\n", 1)[-1].rsplit("```", 1)[0]
+            answers = {int(item['id']): item['answer'] for item in json.loads(response)}
+            return [answers[i] for i in range(len(items))]
+        except Exception as e:
+            print(f"⚠️ Batched ground truth failed, falling back to per-question calls: {e}")
+            return [self.generate_ground_truth(question, contexts) for question, contexts in items]
+    
+    async def create_test_dataset(self, pipeline, num_test_cases: int = 10) -> List[TestCase]:
+        """Create a complete test dataset, building test cases concurrently"""
         
         print(f"🧪 Generating {num_test_cases} test cases for RAGAS evaluation...")
         
-        test_cases = []
-        
-        # Sample queries to get diverse contexts
-        sample_queries = [
-            "diabetes treatment approaches",
-            "cardiovascular medication side effects", 
-            "hypertension management protocols",
-            "clinical trial methodologies",
-            "patient safety considerations",
-            "drug interactions and contraindications",
-            "therapeutic effectiveness measures",
-            "adverse events reporting"
-        ]
+        # Sample queries to get diverse contexts, topped up when more are requested
+        sample_queries = await asyncio.to_thread(self._sample_queries, num_test_cases)
         
-        for i, query in enumerate(sample_queries[:num_test_cases]):
-            try:
-                print(f"📝 Creating test case {i+1}/{num_test_cases}: {query}")
-                
-                # Get relevant contexts
-                chunks = pipeline.search_documents(query, k=4)
-                contexts = [chunk.page_content for chunk in chunks]
-                
-                if not contexts:
-                    continue
-                
-                # Generate questions from contexts
-                questions = self.generate_medical_questions(contexts, num_questions=2)
-                
-                for question in questions[:1]:  # Take first question
-                    # Generate ground truth
-                    ground_truth = self.generate_ground_truth(question, contexts)
-                    
-                    # Get RAG answer
-                    result = pipeline.query(question)
+        # Cap how many test cases talk to Gemini at once
+        semaphore = asyncio.Semaphore(get_settings().gemini_concurrency)
+        
+        async def _draft_case(i: int, query: str, chunks: List):
+            async with semaphore:
+                try:
+                    print(f"📝 Creating test case {i+1}/{num_test_cases}: {query}")
                     
-                    test_case = TestCase(
-                        question=question,
-                        ground_truth=ground_truth,
-                        contexts=contexts,
-                        answer=result['answer'],
-                        metadata={
-                            'sources': result.get('sources', []),
-                            'chunks_found': result.get('chunks_found', 0),
-                            'original_query': query
-                        }
-                    )
+                    # Get relevant contexts
+                    if chunks is None:
+                        chunks = await asyncio.to_thread(pipeline.search_documents, query, 4)
+                    contexts = [chunk.page_content for chunk in chunks]
                     
-                    test_cases.append(test_case)
+                    if not contexts:
+                        return None
                     
-                    if len(test_cases) >= num_test_cases:
-                        break
+                    # Generate a question from contexts (take the first)
+                    questions = await asyncio.to_thread(self.generate_medical_questions, contexts, 2)
+                    if not questions:
+                        return None
+                    return query, questions[0], contexts
                         
-            except Exception as e:
-                print(f"Error creating test case {i+1}: {e}")
-                continue
+                except Exception as e:
+                    print(f"Error creating test case {i+1}: {e}")
+                    return None
+        
+        async def _answer_case(query: str, question: str, contexts: List[str], ground_truth: str):
+            async with semaphore:
+                try:
+                    # Get RAG answer
+                    result = await asyncio.to_thread(pipeline.query, question)
+                except Exception as e:
+                    print(f"Error answering test case '{question}': {e}")
+                    return None
+                
+                return TestCase(
+                    question=question,
+                    ground_truth=ground_truth,
+                    contexts=contexts,
+                    answer=result['answer'],
+                    metadata={
+                        'sources': result.get('sources', []),
+                        'chunks_found': result.get('chunks_found', 0),
+                        'original_query': query
+                    }
+                )
+        
+        # STEP 1: Contexts (one batched search) and questions for every sample query
+        queries = sample_queries
+        try:
+            chunks_per_query = await asyncio.to_thread(pipeline.search_documents_many, queries, 4)
+        except Exception as e:
+            print(f"⚠️ Batched search failed, searching per query: {e}")
+            chunks_per_query = [None] * len(queries)
+        
+        drafts = await asyncio.gather(*[
+            _draft_case(i, query, chunks) for i, (query, chunks) in enumerate(zip(queries, chunks_per_query))
+        ])
+        drafts = [draft for draft in drafts if draft is not None]
+        
+        # STEP 2: Ground truth in a few batched Gemini calls instead of one per question
+        items = [(question, contexts) for _, question, contexts in drafts]
+        batches = await asyncio.gather(*[
+            asyncio.to_thread(self.generate_ground_truth_batch, items[start:start + GROUND_TRUTH_BATCH_SIZE])
+            for start in range(0, len(items), GROUND_TRUTH_BATCH_SIZE)
+        ])
+        ground_truths = [answer for batch in batches for answer in batch]
+        
+        # STEP 3: RAG answers
+        results = await asyncio.gather(*[
+            _answer_case(*draft, ground_truth) for draft, ground_truth in zip(drafts, ground_truths)
+        ])
+        test_cases = [test_case for test_case in results if test_case is not None]
         
         print(f"✅ Generated {len(test_cases)} test cases successfully!")
         return test_cases
     
-    def save_test_dataset(self, test_cases: List[TestCase], filename: str = "ragas_test_dataset.json"):
-        """Save test dataset to JSON file"""
+    def _sample_queries(self, num_queries: int) -> List[str]:
+        """Return num_queries search queries, generating any beyond SAMPLE_QUERIES in one call"""
+        
+        missing = num_queries - len(SAMPLE_QUERIES)
+        if missing <= 0:
+            return SAMPLE_QUERIES[:num_queries]
+        
+        prompt = f"""
+        Generate {missing} short search queries about medical research topics, different from:
+        {chr(10).join(SAMPLE_QUERIES)}
+        
+        One query per line, numbered:
+        """
+        
+        extra_queries = []
+        try:
+            for line in self.gemini_client.chat(prompt).split('\n'):
+                match = _NUM_RE.match(line)
+                if match and line[match.end():].strip():
+                    extra_queries.append(line[match.end():].strip())
+        except Exception as e:
+            print(f"Error generating sample queries: {e}")
         
-        data = []
-        for tc in test_cases:
-            data.append({
+        if len(extra_queries) < missing:
+            print(f"⚠️ Only {len(SAMPLE_QUERIES) + len(extra_queries)} sample queries available")
+        return SAMPLE_QUERIES + extra_queries[:missing]
+    
+    def save_test_dataset(self, test_cases: List[TestCase], filename: str = "ragas_test_dataset.ndjson"):
+        """Save test dataset as newline-delimited JSON, one test case per line"""
+        
+        filepath = Path("data") / filename
+        filepath.parent.mkdir(exist_ok=True)
+        
+        # Write to a temp file and swap it in so a crash never leaves partial JSON;
+        # records are serialized one at a time instead of as one big document
+        tmp_path = filepath.with_suffix(filepath.suffix + ".tmp")
+        with open(tmp_path, 'wb') as f:
+            for tc in test_cases:
+                f.write(orjson.dumps({
+                    'question': tc.question,
+                    'ground_truth': tc.ground_truth,
+                    'contexts': tc.contexts,
+                    'answer': tc.answer,
+                    'metadata': tc.metadata or {}
+                }, option=orjson.OPT_NON_STR_KEYS))
+                f.write(b"\n")
+        os.replace(tmp_path, filepath)
+        
+        print(f"💾 Test dataset saved to: {filepath}")
+        return filepath
+    
+    def save_test_dataset_parquet(self, test_cases: List[TestCase], filename: str = "ragas_test_dataset.parquet"):
+        """Save test dataset to a zstd-compressed Parquet file"""
+        
+        df = pd.DataFrame([
+            {
                 'question': tc.question,
                 'ground_truth': tc.ground_truth,
                 'contexts': tc.contexts,
                 'answer': tc.answer,
-                'metadata': tc.metadata or {}
-            })
+                # Free-form metadata is stored as JSON text to keep a flat schema
+                'metadata': json.dumps(tc.metadata or {}, ensure_ascii=False)
+            }
+            for tc in test_cases
+        ])
         
         filepath = Path("data") / filename
         filepath.parent.mkdir(exist_ok=True)
-        
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=2, ensure_ascii=False)
+        df.to_parquet(filepath, compression="zstd", index=False)
         
         print(f"💾 Test dataset saved to: {filepath}")
         return filepath
     
-    def load_test_dataset(self, filename: str = "ragas_test_dataset.json") -> List[TestCase]:
-        """Load test dataset from JSON file"""
+    def load_test_dataset(self, filename: str = "ragas_test_dataset.ndjson") -> List[TestCase]:
+        """Load test dataset from whichever of the Parquet and JSON copies is newer"""
         
         filepath = Path("data") / filename
+        parquet_path = filepath.with_suffix(".parquet")
+        
+        # A stale Parquet file must not hide a regenerated JSON dataset
+        if parquet_path.exists() and (
+            not filepath.exists() or parquet_path.stat().st_mtime >= filepath.stat().st_mtime
+        ):
+            test_cases = [
+                TestCase(
+                    question=item['question'],
+                    ground_truth=item['ground_truth'],
+                    contexts=list(item['contexts']),
+                    answer=item.get('answer', ''),
+                    metadata=json.loads(item['metadata']) if item.get('metadata') else {}
+                )
+                for item in pd.read_parquet(parquet_path).to_dict("records")
+            ]
+            print(f"📁 Loaded {len(test_cases)} test cases from: {parquet_path}")
+            return test_cases
         
         if not filepath.exists():
             print(f"❌ Test dataset not found: {filepath}")
             return []
         
-        with open(filepath, 'r', encoding='utf-8') as f:
-            data = json.load(f)
-        
-        test_cases = []
-        for item in data:
-            test_case = TestCase(
+        test_cases = [
+            TestCase(
                 question=item['question'],
                 ground_truth=item['ground_truth'],
                 contexts=item['contexts'],
                 answer=item.get('answer', ''),
                 metadata=item.get('metadata', {})
             )
-            test_cases.append(test_case)
+            for item in _iter_records(filepath)
+        ]
         
         print(f"📁 Loaded {len(test_cases)} test cases from: {filepath}")
         return test_cases
@@ -213,10 +372,7 @@ class TestDatasetGenerator:
         ]
 
 # Global instance
-_generator = None
+_generator = LazySingleton(TestDatasetGenerator)
 
 def get_test_dataset_generator():
-    global _generator
-    if _generator is None:
-        _generator = TestDatasetGenerator()
-    return _generator 
\ No newline at end of file
+    return _generator.get() 
\ No newline at end of file
@@ -1,3 +1,3 @@
-from .pipeline import MedicalRAGPipeline, get_rag_pipeline
+from .pipeline import MedicalRAGPipeline, get_rag_pipeline, reset_rag_pipeline
 
-__all__ = ['MedicalRAGPipeline', 'get_rag_pipeline'] 
\ No newline at end of file
+__all__ = ['MedicalRAGPipeline', 'get_rag_pipeline', 'reset_rag_pipeline'] 
\ No newline at end of file
@@ -1,13 +1,104 @@
 import os
+import uuid
 import asyncio
+import hashlib
+from collections import OrderedDict
+from itertools import islice
+from functools import lru_cache
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+import xxhash
 from pathlib import Path
-from typing import List, Union
+from typing import Iterator, List, Tuple, Union
 from langchain_community.document_loaders import PyPDFLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
+from langchain_core.documents import Document
 from langchain_qdrant import QdrantVectorStore
+from qdrant_client import AsyncQdrantClient, QdrantClient
+from qdrant_client.models import (
+    Distance,
+    HnswConfigDiff,
+    QueryRequest,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+from core.cache import TTLCache
 from core.config import get_settings
 from core.gemini_client import get_gemini_client
+from core.singleton import LazySingleton
+
+EMBEDDING_MODEL = "models/embedding-001"
+# Most recent query embeddings kept in memory
+QUERY_CACHE_SIZE = 4096
+
+# Chunks per embedding request / Qdrant upsert (Gemini's batchEmbedContents
+# maximum), and max in-flight embedding requests
+EMBED_BATCH_SIZE = 100
+EMBED_CONCURRENCY = 8
+# Chunk vectors remembered across PDFs for deduplication during ingestion
+DEDUP_MEMO_SIZE = 8192
+
+# HNSW graph settings for the document collection
+HNSW_CONFIG = HnswConfigDiff(m=32, ef_construct=128)
+
+# int8 scalar quantization: 4x smaller vectors kept in RAM, originals on disk for rescoring
+INT8_QUANTIZATION = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+
+# Shared splitter; built once per process (including each ingest worker)
+_SPLITTER = RecursiveCharacterTextSplitter(
+    chunk_size=1000,
+    chunk_overlap=200,
+)
+
+@lru_cache(maxsize=None)
+def get_qdrant_client(url: str, grpc_port: int) -> QdrantClient:
+    """Process-wide Qdrant client per server, so every session shares one gRPC channel"""
+    return QdrantClient(url=url, prefer_grpc=True, grpc_port=grpc_port, timeout=30)
+
+def _batched(items: List, size: int) -> Iterator[List]:
+    """Yield consecutive fixed-size slices of items"""
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+def _parse_and_chunk(pdf_path: str) -> Tuple[int, List[dict]]:
+    """Load and split one PDF; returns page count and picklable chunk dicts"""
+    print(f"📄 Loading: {pdf_path}")
+    docs = PyPDFLoader(file_path=pdf_path).load()
+    
+    # Add source metadata
+    for doc in docs:
+        doc.metadata['source_file'] = os.path.basename(pdf_path)
+    
+    split_docs = _SPLITTER.split_documents(documents=docs)
+    return len(docs), [{'page_content': d.page_content, 'metadata': d.metadata} for d in split_docs]
+
+def _dedup_texts(texts: List[str]) -> Tuple[List[str], List[int], List[int]]:
+    """Return unique texts, their hashes and, for each input text, its index among them"""
+    index_by_hash = {}
+    unique_texts = []
+    positions = []
+    for text in texts:
+        position = index_by_hash.setdefault(xxhash.xxh3_64_intdigest(text), len(unique_texts))
+        if position == len(unique_texts):
+            unique_texts.append(text)
+        positions.append(position)
+    return unique_texts, list(index_by_hash), positions
+
+def _points_to_documents(points) -> List[Document]:
+    """Convert Qdrant scored points back into LangChain documents"""
+    return [
+        Document(
+            page_content=point.payload.get(QdrantVectorStore.CONTENT_KEY, ""),
+            metadata=point.payload.get(QdrantVectorStore.METADATA_KEY) or {},
+        )
+        for point in points
+    ]
 
 class MedicalRAGPipeline:
     def __init__(self):
@@ -16,13 +107,19 @@ class MedicalRAGPipeline:
         
         # Initialize embeddings
         self.embedding_model = GoogleGenerativeAIEmbeddings(
-            model="models/embedding-001",
+            model=EMBEDDING_MODEL,
             google_api_key=self.settings.gemini_api_key
         )
+        # Locked LRU of query vectors keyed by model + sha256(query); vectors
+        # never go stale, so entries only leave by eviction
+        self._query_vectors = TTLCache(QUERY_CACHE_SIZE, ttl=float("inf"))
+        
+        self.quantization_config = INT8_QUANTIZATION if self.settings.quantization == "int8" else None
         
         # Initialize vector store
         self.vector_store = None
         self.retriever = None
+        self.async_client = None
     
     def ingest_pdf(self, pdf_path: str):
         """Ingest single PDF document into vector store"""
@@ -32,18 +129,22 @@ class MedicalRAGPipeline:
         docs = loader.load()
         
         # STEP 2: Split documents 
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-        )
-        split_docs = text_splitter.split_documents(documents=docs)
+        split_docs = _SPLITTER.split_documents(documents=docs)
         
         # STEP 3 & 4: Create embeddings and store in Qdrant
         self.vector_store = QdrantVectorStore.from_documents(
             documents=split_docs,
             url=self.settings.qdrant_url,
+            prefer_grpc=True,
+            grpc_port=self.settings.qdrant_grpc_port,
             collection_name=self.settings.collection_name,
             embedding=self.embedding_model,
+            # Extra kwargs go to the QdrantClient constructor; collection
+            # settings must be passed through collection_create_options
+            collection_create_options={
+                "hnsw_config": HNSW_CONFIG,
+                "quantization_config": self.quantization_config,
+            },
         )
         
         print(f"✅ Ingested {len(docs)} pages, {len(split_docs)} chunks from {pdf_path}")
@@ -51,81 +152,240 @@ class MedicalRAGPipeline:
     
     async def ingest_multiple_pdfs_async(self, pdf_paths: List[str]):
         """Ingest multiple PDF documents with async embedding processing"""
-        all_docs = []
-        
         print(f"📚 Loading {len(pdf_paths)} PDF files...")
         
-        # STEP 1: Load all PDFs
-        for pdf_path in pdf_paths:
-            print(f"📄 Loading: {pdf_path}")
-            loader = PyPDFLoader(file_path=pdf_path)
-            docs = loader.load()
+        total_pages = 0
+        total_chunks = 0
+        # Vectors of recently embedded chunk texts, so boilerplate shared
+        # across papers is embedded once without holding every vector
+        vector_memo = OrderedDict()
+        
+        # STEP 1 & 2: Load and split PDFs across CPU cores (parsing is GIL-bound)
+        max_workers = max(1, min(len(pdf_paths), os.cpu_count() or 1))
+        pool = ProcessPoolExecutor(max_workers=max_workers) if max_workers > 1 else None
+        try:
+            loop = asyncio.get_running_loop()
             
-            # Add source metadata
-            for doc in docs:
-                doc.metadata['source_file'] = os.path.basename(pdf_path)
+            def submit(pdf_path: str) -> asyncio.Future:
+                if pool is None:
+                    # Nothing to overlap with, so skip the process spawn and use a thread
+                    return asyncio.ensure_future(asyncio.to_thread(_parse_and_chunk, pdf_path))
+                return loop.run_in_executor(pool, _parse_and_chunk, pdf_path)
             
-            all_docs.extend(docs)
+            # Sliding window: at most max_workers parses in flight or finished but
+            # not yet consumed; the next PDF is submitted only after one is embedded,
+            # so memory is bounded by the window rather than the whole corpus
+            remaining = iter(pdf_paths)
+            pending = {submit(pdf_path) for pdf_path in islice(remaining, max_workers)}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                next_parsed = done.pop()
+                # Anything else that finished goes back and is consumed next round
+                pending |= done
+                pages, chunks = next_parsed.result()
+                split_docs = [Document(**chunk) for chunk in chunks]
+                del chunks
+                
+                # STEP 3: Create embeddings in concurrent batches
+                vectors = await self._embed_chunks(split_docs, vector_memo)
+                
+                # STEP 4: Store precomputed vectors in Qdrant
+                if split_docs:
+                    await asyncio.to_thread(self._store_embeddings, split_docs, vectors)
+                
+                total_pages += pages
+                total_chunks += len(split_docs)
+                print(f"📝 Stored {len(split_docs)} chunks from {pages} pages")
+                del split_docs, vectors
+                
+                # Refill the window now that this PDF has been released
+                for pdf_path in islice(remaining, 1):
+                    pending.add(submit(pdf_path))
+        finally:
+            if pool is not None:
+                pool.shutdown()
         
-        # STEP 2: Split all documents
-        text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=200,
-        )
-        all_split_docs = text_splitter.split_documents(documents=all_docs)
+        print(f"✅ Successfully ingested {len(pdf_paths)} PDFs with {total_chunks} total chunks")
+        return {
+            'total_pdfs': len(pdf_paths),
+            'total_pages': total_pages,
+            'total_chunks': total_chunks,
+            'files_processed': [os.path.basename(path) for path in pdf_paths]
+        }
+    
+    async def _embed_chunks(self, docs: List[Document], vector_memo: OrderedDict) -> List[np.ndarray]:
+        """Embed chunk texts, skipping duplicates and texts already in vector_memo"""
+        unique_texts, hashes, positions = _dedup_texts([doc.page_content for doc in docs])
         
-        print(f"📝 Created {len(all_split_docs)} chunks from {len(all_docs)} pages")
+        missing = [i for i, text_hash in enumerate(hashes) if text_hash not in vector_memo]
+        skipped = len(docs) - len(missing)
+        if skipped:
+            print(f"♻️ Skipping {skipped} duplicate chunks")
         
-        # STEP 3: Create embeddings asynchronously (simulate async with batch processing)
-        print("🔢 Creating embeddings...")
+        new_vectors = await self._embed_documents_async([unique_texts[i] for i in missing])
+        for i, vector in zip(missing, new_vectors):
+            vector_memo[hashes[i]] = np.asarray(vector, dtype=np.float32)
         
-        # Process embeddings in batches for better performance
-        batch_size = 10
-        batches = [all_split_docs[i:i + batch_size] for i in range(0, len(all_split_docs), batch_size)]
+        unique_vectors = []
+        for text_hash in hashes:
+            vector_memo.move_to_end(text_hash)
+            unique_vectors.append(vector_memo[text_hash])
+        while len(vector_memo) > DEDUP_MEMO_SIZE:
+            vector_memo.popitem(last=False)
         
-        # STEP 4: Store in Qdrant with async-like processing
-        self.vector_store = QdrantVectorStore.from_documents(
-            documents=all_split_docs,
-            url=self.settings.qdrant_url,
-            collection_name=self.settings.collection_name,
-            embedding=self.embedding_model,
+        return [unique_vectors[position] for position in positions]
+    
+    async def _embed_documents_async(self, texts: List[str]) -> List[List[float]]:
+        """Embed texts in batches, running up to EMBED_CONCURRENCY requests at once"""
+        semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+        
+        async def _embed(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await asyncio.to_thread(
+                    self.embedding_model.embed_documents, batch, batch_size=EMBED_BATCH_SIZE
+                )
+        
+        results = await asyncio.gather(*[_embed(batch) for batch in _batched(texts, EMBED_BATCH_SIZE)])
+        return [vector for batch in results for vector in batch]
+    
+    def _store_embeddings(self, docs: List, vectors: List):
+        """Upsert documents with precomputed vectors and attach the vector store"""
+        # One gRPC channel reused across the per-PDF uploads and queries
+        client = get_qdrant_client(self.settings.qdrant_url, self.settings.qdrant_grpc_port)
+        collection_name = self.settings.collection_name
+        
+        if vectors and not client.collection_exists(collection_name):
+            client.create_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=len(vectors[0]), distance=Distance.COSINE),
+                hnsw_config=HNSW_CONFIG,
+                quantization_config=self.quantization_config,
+            )
+        
+        # Stream points over gRPC as packed float32 instead of JSON-encoded lists
+        client.upload_collection(
+            collection_name=collection_name,
+            vectors=np.asarray(vectors, dtype=np.float32),
+            payload=[
+                {
+                    QdrantVectorStore.CONTENT_KEY: doc.page_content,
+                    QdrantVectorStore.METADATA_KEY: doc.metadata,
+                }
+                for doc in docs
+            ],
+            ids=[uuid.uuid4().hex for _ in docs],
+            batch_size=EMBED_BATCH_SIZE,
         )
         
-        print(f"✅ Successfully ingested {len(pdf_paths)} PDFs with {len(all_split_docs)} total chunks")
-        return {
-            'total_pdfs': len(pdf_paths),
-            'total_pages': len(all_docs),
-            'total_chunks': len(all_split_docs),
-            'files_processed': [os.path.basename(path) for path in pdf_paths]
-        }
+        self.vector_store = QdrantVectorStore(
+            client=client,
+            collection_name=collection_name,
+            embedding=self.embedding_model,
+        )
     
     def setup_retriever(self):
         """Setup retriever from existing Qdrant collection"""
-        self.retriever = QdrantVectorStore.from_existing_collection(
-            url=self.settings.qdrant_url,
+        self.retriever = QdrantVectorStore(
+            client=get_qdrant_client(self.settings.qdrant_url, self.settings.qdrant_grpc_port),
             collection_name=self.settings.collection_name,
             embedding=self.embedding_model,
         )
         print("✅ Retriever setup complete")
     
+    def _query_cache_key(self, query: str) -> str:
+        # Model prefix invalidates cached vectors when the embedding model changes
+        return f"{EMBEDDING_MODEL}:{hashlib.sha256(query.encode('utf-8')).hexdigest()}"
+    
+    def _get_query_vector(self, query: str):
+        return self._query_vectors.get(self._query_cache_key(query))
+    
+    def _put_query_vector(self, query: str, vector: List[float]) -> List[float]:
+        self._query_vectors.set(self._query_cache_key(query), vector)
+        return vector
+    
+    def embed_query(self, query: str) -> List[float]:
+        """Embed a query, reusing the vector for previously seen queries"""
+        vector = self._get_query_vector(query)
+        if vector is None:
+            vector = self._put_query_vector(query, self.embedding_model.embed_query(query))
+        return vector
+    
+    async def aembed_query(self, query: str) -> List[float]:
+        """Async embed_query sharing the same cache"""
+        vector = self._get_query_vector(query)
+        if vector is None:
+            vector = self._put_query_vector(query, await self.embedding_model.aembed_query(query))
+        return vector
+    
     def search_documents(self, query: str, k: int = 4) -> List:
         """Search for relevant chunks"""
         if not self.retriever:
             self.setup_retriever()
         
-        relevant_chunks = self.retriever.similarity_search(query, k=k)
+        relevant_chunks = self.retriever.similarity_search_by_vector(
+            self.embed_query(query),
+            k=k,
+            search_params=SearchParams(hnsw_ef=self.settings.hnsw_ef),
+        )
         return relevant_chunks
     
+    async def search_documents_async(self, query: str, k: int = 4) -> List:
+        """Search for relevant chunks without blocking the event loop"""
+        if self.async_client is None:
+            self.async_client = AsyncQdrantClient(
+                url=self.settings.qdrant_url,
+                prefer_grpc=True,
+                grpc_port=self.settings.qdrant_grpc_port,
+            )
+        
+        query_vector = await self.aembed_query(query)
+        response = await self.async_client.query_points(
+            collection_name=self.settings.collection_name,
+            query=query_vector,
+            limit=k,
+            with_payload=True,
+            search_params=SearchParams(hnsw_ef=self.settings.hnsw_ef),
+        )
+        return _points_to_documents(response.points)
+    
+    def search_documents_many(self, queries: List[str], k: int = 4) -> List[List[Document]]:
+        """Search several queries with one embedding call and one batched Qdrant request"""
+        if not queries:
+            return []
+        if not self.retriever:
+            self.setup_retriever()
+        
+        # Embed only the queries missing from the cache, in a single batch
+        vectors = [self._get_query_vector(query) for query in queries]
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = self.embedding_model.embed_documents(
+                [queries[i] for i in missing], task_type="retrieval_query"
+            )
+            for i, vector in zip(missing, new_vectors):
+                vectors[i] = self._put_query_vector(queries[i], vector)
+        
+        search_params = SearchParams(hnsw_ef=self.settings.hnsw_ef)
+        responses = self.retriever.client.query_batch_points(
+            collection_name=self.settings.collection_name,
+            requests=[
+                QueryRequest(query=vector, limit=k, with_payload=True, params=search_params)
+                for vector in vectors
+            ],
+        )
+        return [_points_to_documents(response.points) for response in responses]
+    
     def format_context(self, chunks: List) -> str:
         """Format chunks into context string with source information"""
-        context_parts = []
-        for i, chunk in enumerate(chunks, 1):
-            page_content = chunk.page_content
-            page_num = chunk.metadata.get('page', 'N/A')
-            source_file = chunk.metadata.get('source_file', 'Unknown')
-            context_parts.append(f"[Source: {source_file}, Page {page_num}, Chunk {i}]: {page_content}")
+        def _parts():
+            for i, chunk in enumerate(chunks, 1):
+                metadata = chunk.metadata
+                yield (
+                    f"[Source: {metadata.get('source_file', 'Unknown')}, "
+                    f"Page {metadata.get('page', 'N/A')}, Chunk {i}]: {chunk.page_content}"
+                )
         
-        return "\n\n".join(context_parts)
+        return "\n\n".join(_parts())
     
     def create_system_prompt(self, context: str) -> str:
         """Create system prompt with context"""
@@ -144,11 +404,12 @@ Instructions:
 - Do not provide medical advice - this is for research purposes only
 """
     
-    def query(self, question: str, k: int = 4) -> dict:
-        """Complete RAG query pipeline"""
+    def query(self, question: str, k: int = 4, relevant_chunks: List = None) -> dict:
+        """Complete RAG query pipeline; pass relevant_chunks to skip retrieval"""
         
         # Step 1: Retrieve relevant chunks
-        relevant_chunks = self.search_documents(question, k=k)
+        if relevant_chunks is None:
+            relevant_chunks = self.search_documents(question, k=k)
         
         # Step 2: Format context
         context = self.format_context(relevant_chunks)
@@ -164,14 +425,38 @@ Instructions:
             "answer": answer,
             "context": context,
             "chunks_found": len(relevant_chunks),
-            "sources": list(set([chunk.metadata.get('source_file', 'Unknown') for chunk in relevant_chunks]))
+            "chunks": relevant_chunks,
+            # Ordered dedup keeps sources deterministic across runs
+            "sources": list(dict.fromkeys(chunk.metadata.get('source_file', 'Unknown') for chunk in relevant_chunks))
+        }
+
+    def stream_query(self, question: str, k: int = 4) -> dict:
+        """RAG query whose answer is a generator of text chunks under 'answer_stream'"""
+        
+        # Step 1: Retrieve relevant chunks (eagerly, so metadata is ready before streaming)
+        relevant_chunks = self.search_documents(question, k=k)
+        
+        # Step 2: Format context
+        context = self.format_context(relevant_chunks)
+        
+        # Step 3: Create system prompt
+        system_prompt = self.create_system_prompt(context)
+        
+        # Step 4: Generation starts when the caller iterates the stream
+        return {
+            "question": question,
+            "answer_stream": self.gemini_client.chat_stream(question, system_prompt),
+            "context": context,
+            "chunks_found": len(relevant_chunks),
+            "chunks": relevant_chunks,
+            "sources": list(dict.fromkeys(chunk.metadata.get('source_file', 'Unknown') for chunk in relevant_chunks))
         }
 
     async def query_async(self, question: str, k: int = 4) -> dict:
         """Async version of complete RAG query pipeline"""
         
         # Step 1: Retrieve relevant chunks
-        relevant_chunks = await asyncio.to_thread(self.search_documents, question, k)
+        relevant_chunks = await self.search_documents_async(question, k)
         
         # Step 2: Format context  
         context = self.format_context(relevant_chunks)
@@ -180,21 +465,28 @@ Instructions:
         system_prompt = self.create_system_prompt(context)
         
         # Step 4: Generate answer asynchronously
-        answer = await asyncio.to_thread(self.gemini_client.chat, question, system_prompt)
+        answer = await self.gemini_client.achat(question, system_prompt)
         
         return {
             "question": question,
             "answer": answer,
             "context": context,
             "chunks_found": len(relevant_chunks),
-            "sources": list(set([chunk.metadata.get('source_file', 'Unknown') for chunk in relevant_chunks]))
+            "chunks": relevant_chunks,
+            # Ordered dedup keeps sources deterministic across runs
+            "sources": list(dict.fromkeys(chunk.metadata.get('source_file', 'Unknown') for chunk in relevant_chunks))
         }
 
+    async def evaluate_many(self, questions: List[str], k: int = 4) -> List[dict]:
+        """Run query_async for a batch of questions concurrently, in order"""
+        return await asyncio.gather(*[self.query_async(question, k) for question in questions])
+
 # Global pipeline instance
-_pipeline = None
+_pipeline = LazySingleton(MedicalRAGPipeline)
 
 def get_rag_pipeline():
-    global _pipeline
-    if _pipeline is None:
-        _pipeline = MedicalRAGPipeline()
-    return _pipeline 
\ No newline at end of file
+    return _pipeline.get()
+
+def reset_rag_pipeline():
+    """Drop the global pipeline so the next get_rag_pipeline builds a fresh one"""
+    _pipeline.reset()
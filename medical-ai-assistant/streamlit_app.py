@@ -7,26 +7,23 @@ import streamlit as st
 import sys
 import os
 import asyncio
+import threading
 from pathlib import Path
 import time
+from collections import deque
+from itertools import islice
+import google.generativeai as genai
+from dotenv import load_dotenv
 
 # Add src to path
 sys.path.append(os.path.join(os.path.dirname(__file__), 'src'))
 
-from rag.pipeline import get_rag_pipeline
-from evaluation.ragas_evaluator import get_ragas_evaluator
+from rag.pipeline import get_rag_pipeline, reset_rag_pipeline
+from evaluation.ragas_evaluator import get_ragas_evaluator, reset_ragas_evaluator
 from evaluation.test_datasets import get_test_dataset_generator
 
-# Page configuration
-st.set_page_config(
-    page_title="Medical AI Assistant",
-    page_icon="🏥",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
-
-# Custom CSS
-st.markdown("""
+# Static page content, built once per process rather than on every rerun
+CSS_BLOCK = """
 <style>
 .main-header {
     font-size: 2.5rem;
@@ -60,14 +57,81 @@ st.markdown("""
     border-left: 4px solid #ffc107;
 }
 </style>
-""", unsafe_allow_html=True)
+"""
+
+EXAMPLE_QUESTIONS = [
+    "What are the main findings about diabetes treatment?",
+    "What methodologies were used in cardiovascular studies?",
+    "What are the side effects mentioned for hypertension medications?",
+    "What are the key limitations mentioned in the research?",
+    "What treatment protocols showed the best outcomes?",
+    "What are the contraindications mentioned for the medications?",
+    "What patient populations were studied?",
+    "What statistical methods were used in the analysis?"
+]
+
+# Past queries kept per session
+HISTORY_SIZE = 50
+
+# Medical context prompt for answers without document retrieval
+FALLBACK_PROMPT = """You are a medical AI assistant. Answer this medical question based on your training knowledge:
+
+Question: {question}
+
+Please provide a helpful, accurate response. If you're unsure about medical advice, recommend consulting healthcare professionals."""
+
+FOOTER_HTML = """
+    <div style='text-align: center; color: #666; padding: 2rem;'>
+        🏥 Medical AI Assistant - For Research Purposes Only<br>
+        ⚠️ This tool is for informational and research purposes only. Always consult healthcare professionals for medical advice.
+    </div>
+    """
+
+# Page configuration
+st.set_page_config(
+    page_title="Medical AI Assistant",
+    page_icon="🏥",
+    layout="wide",
+    initial_sidebar_state="expanded"
+)
+
+# Custom CSS
+st.markdown(CSS_BLOCK, unsafe_allow_html=True)
+
+@st.cache_resource
+def _get_event_loop():
+    """Background event loop shared by all sessions, so async clients outlive a single run"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def _run_async(coro):
+    """Run a coroutine on the shared loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coro, _get_event_loop()).result()
+
+@st.cache_resource
+def _get_pipeline():
+    """RAG pipeline with retriever, shared across sessions and reruns"""
+    pipeline = get_rag_pipeline()
+    pipeline.setup_retriever()
+    return pipeline
+
+@st.cache_resource
+def _get_ragas_evaluator():
+    return get_ragas_evaluator()
+
+@st.cache_resource
+def _get_test_dataset_generator():
+    return get_test_dataset_generator()
 
 def initialize_session_state():
     """Initialize session state variables"""
     if 'pipeline' not in st.session_state:
         st.session_state.pipeline = None
     if 'conversation_history' not in st.session_state:
-        st.session_state.conversation_history = []
+        # Bounded so long-lived sessions don't grow without limit
+        st.session_state.conversation_history = deque(maxlen=HISTORY_SIZE)
+        st.session_state.query_count = 0
     if 'pipeline_initialized' not in st.session_state:
         st.session_state.pipeline_initialized = False
     if 'ragas_results' not in st.session_state:
@@ -82,8 +146,7 @@ def load_pipeline():
     try:
         if st.session_state.pipeline is None:
             with st.spinner("🚀 Initializing Medical AI Assistant..."):
-                st.session_state.pipeline = get_rag_pipeline()
-                st.session_state.pipeline.setup_retriever()
+                st.session_state.pipeline = _get_pipeline()
                 st.session_state.pipeline_initialized = True
             st.success("✅ Medical AI Assistant initialized successfully!")
         return True
@@ -101,14 +164,18 @@ def run_ragas_evaluation():
     try:
         with st.spinner("🧪 Running RAGAS evaluation..."):
             # Initialize evaluator
-            evaluator = get_ragas_evaluator()
-            dataset_generator = get_test_dataset_generator()
+            evaluator = _get_ragas_evaluator()
+            dataset_generator = _get_test_dataset_generator()
             
-            # Generate test cases
-            test_cases = dataset_generator.create_test_dataset(st.session_state.pipeline, num_test_cases=5)
+            pipeline = st.session_state.pipeline
             
-            # Run evaluation
-            results = asyncio.run(evaluator.evaluate_test_cases(test_cases))
+            async def _generate_and_evaluate():
+                # Generate test cases (built concurrently), then score them concurrently
+                test_cases = await dataset_generator.create_test_dataset(pipeline, num_test_cases=5)
+                return await evaluator.evaluate_test_cases(test_cases)
+            
+            # One submission to the shared loop for the whole evaluation
+            results = _run_async(_generate_and_evaluate())
             
             st.session_state.ragas_results = results
             
@@ -118,6 +185,21 @@ def run_ragas_evaluation():
         st.error(f"❌ RAGAS evaluation failed: {e}")
         return None
 
+@st.cache_data(ttl=3600)
+def _format_metrics(metric_items):
+    """Overall score and (label, value) pairs for metric widgets, cached per result set"""
+    labels = []
+    for metric, score in metric_items:
+        if score >= 0.8:
+            icon = "🟢"
+        elif score >= 0.6:
+            icon = "🟡"
+        else:
+            icon = "🔴"
+        labels.append((f"{icon} {metric.replace('_', ' ').title()}", f"{score:.3f}"))
+    overall_score = sum(score for _, score in metric_items) / len(metric_items)
+    return overall_score, labels
+
 def display_ragas_results():
     """Display RAGAS evaluation results"""
     if st.session_state.ragas_results:
@@ -127,7 +209,7 @@ def display_ragas_results():
         
         # Overall score
         metrics = results['metrics']
-        overall_score = sum(metrics.values()) / len(metrics)
+        overall_score, metric_labels = _format_metrics(tuple(metrics.items()))
         
         if overall_score >= 0.8:
             st.success(f"🟢 Excellent Performance: {overall_score:.3f}")
@@ -140,24 +222,12 @@ def display_ragas_results():
         col1, col2 = st.columns(2)
         
         with col1:
-            for i, (metric, score) in enumerate(metrics.items()):
-                if i % 2 == 0:
-                    if score >= 0.8:
-                        st.metric(f"🟢 {metric.replace('_', ' ').title()}", f"{score:.3f}")
-                    elif score >= 0.6:
-                        st.metric(f"🟡 {metric.replace('_', ' ').title()}", f"{score:.3f}")
-                    else:
-                        st.metric(f"🔴 {metric.replace('_', ' ').title()}", f"{score:.3f}")
+            for label, value in metric_labels[0::2]:
+                st.metric(label, value)
         
         with col2:
-            for i, (metric, score) in enumerate(metrics.items()):
-                if i % 2 == 1:
-                    if score >= 0.8:
-                        st.metric(f"🟢 {metric.replace('_', ' ').title()}", f"{score:.3f}")
-                    elif score >= 0.6:
-                        st.metric(f"🟡 {metric.replace('_', ' ').title()}", f"{score:.3f}")
-                    else:
-                        st.metric(f"🔴 {metric.replace('_', ' ').title()}", f"{score:.3f}")
+            for label, value in metric_labels[1::2]:
+                st.metric(label, value)
         
         # Recommendations
         st.subheader("💡 Recommendations")
@@ -178,120 +248,57 @@ def display_conversation_history():
     """Display conversation history"""
     if st.session_state.conversation_history:
         st.subheader("💬 Conversation History")
-        for i, entry in enumerate(reversed(st.session_state.conversation_history[-5:])):  # Show last 5
-            with st.expander(f"Query {len(st.session_state.conversation_history) - i}: {entry['question'][:60]}..."):
+        latest = st.session_state.query_count
+        entries = islice(reversed(st.session_state.conversation_history), 5)  # Show last 5
+        for number, entry in zip(range(latest, 0, -1), entries):
+            with st.expander(f"Query {number}: {entry['question'][:60]}..."):
                 st.markdown(f"**🔍 Question:** {entry['question']}")
                 st.markdown(f"**📝 Answer:** {entry['answer']}")
                 if entry.get('sources'):
                     st.markdown(f"**📚 Sources:** {', '.join(entry['sources'])}")
                 st.markdown(f"**⏰ Time:** {entry.get('timestamp', 'Unknown')}")
 
+@st.cache_resource
+def _get_fallback_model():
+    """Gemini model for fallback chat, configured once per server"""
+    # Load environment variables
+    load_dotenv()
+    api_key = os.getenv('GEMINI_API_KEY')
+    
+    if not api_key:
+        return None
+    
+    # Configure Gemini
+    genai.configure(api_key=api_key)
+    return genai.GenerativeModel('gemini-1.5-flash')
+
 def fallback_chat(question):
-    """Simple Gemini chat without document retrieval"""
+    """Simple Gemini chat without document retrieval, yielded as it is generated"""
     try:
-        import google.generativeai as genai
-        import os
-        from dotenv import load_dotenv
-        
-        # Load environment variables
-        load_dotenv()
-        api_key = os.getenv('GEMINI_API_KEY')
-        
-        if not api_key:
-            return "❌ GEMINI_API_KEY not found in environment variables"
-        
-        # Configure Gemini
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel('gemini-1.5-flash')
-        
-        # Create medical context prompt
-        prompt = f"""You are a medical AI assistant. Answer this medical question based on your training knowledge:
-
-Question: {question}
-
-Please provide a helpful, accurate response. If you're unsure about medical advice, recommend consulting healthcare professionals."""
+        model = _get_fallback_model()
+        if model is None:
+            yield "❌ GEMINI_API_KEY not found in environment variables"
+            return
         
-        # Generate response
-        response = model.generate_content(prompt)
-        return response.text
+        # Stream the response so tokens render as they arrive
+        for chunk in model.generate_content(FALLBACK_PROMPT.format(question=question), stream=True):
+            yield chunk.text
         
     except Exception as e:
-        return f"❌ Error in fallback chat: {e}"
+        yield f"❌ Error in fallback chat: {e}"
 
-def main():
-    """Main Streamlit application"""
-    initialize_session_state()
-    
-    # Header
-    st.markdown('<h1 class="main-header">🏥 Medical AI Assistant</h1>', unsafe_allow_html=True)
-    st.markdown("**Query your medical research documents with AI-powered search and generation**")
+@st.fragment
+def _query_fragment(retrieval_k, show_context):
+    """Query section plus history; widget events here rerun only this block"""
+    _query_section(retrieval_k, show_context)
     
-    # Sidebar
-    with st.sidebar:
-        st.header("🔧 Configuration")
-        
-        # Pipeline status
-        if st.session_state.pipeline_initialized:
-            st.success("✅ Pipeline Ready")
-        else:
-            st.warning("⏳ Pipeline Not Initialized")
-        
-        st.markdown("---")
-        
-        # Settings
-        st.subheader("⚙️ Query Settings")
-        retrieval_k = st.slider("Number of documents to retrieve", 1, 10, 4)
-        show_context = st.checkbox("Show retrieved context", value=False)
-        
-        st.markdown("---")
-        
-        # Quick actions
-        st.subheader("🚀 Quick Actions")
-        if st.button("🔄 Reinitialize Pipeline"):
-            st.session_state.pipeline = None
-            st.session_state.pipeline_initialized = False
-            st.rerun()
-        
-        if st.button("🗑️ Clear History"):
-            st.session_state.conversation_history = []
-            st.rerun()
-        
-        # RAGAS Evaluation
-        st.markdown("---")
-        st.subheader("🧪 RAGAS Evaluation")
-        
-        if st.button("🎯 Run RAGAS Test", help="Evaluate RAG system quality"):
-            if st.session_state.pipeline_initialized:
-                run_ragas_evaluation()
-                st.session_state.show_ragas = True
-                st.rerun()
-            else:
-                st.error("Initialize pipeline first")
-        
-        if st.session_state.ragas_results:
-            if st.button("📊 View RAGAS Results"):
-                st.session_state.show_ragas = True
-                st.rerun()
-        
+    # Conversation history lives in the fragment so new answers show up at once
+    if st.session_state.conversation_history:
         st.markdown("---")
-        
-        # System info
-        st.subheader("ℹ️ System Info")
-        st.info("💡 Make sure Qdrant is running on localhost:6333")
-        st.info("📚 Ensure you have ingested medical research PDFs")
-    
-    # Main interface
-    if not st.session_state.pipeline_initialized:
-        # Try to initialize pipeline first
-        if st.button("🚀 Initialize Medical AI Assistant"):
-            load_pipeline()
-            st.rerun()
-        
-        # If still not initialized, check for fallback mode
-        if not st.session_state.pipeline_initialized and not st.session_state.get('fallback_mode', False):
-            st.warning("⚠️ Please initialize the pipeline first")
-            return
-    
+        display_conversation_history()
+
+def _query_section(retrieval_k, show_context):
+    """Query input and answer"""
     # Query interface
     st.subheader("🔍 Ask Your Medical Research Question")
     
@@ -305,17 +312,7 @@ def main():
             height=100
         )
     else:
-        example_questions = [
-            "What are the main findings about diabetes treatment?",
-            "What methodologies were used in cardiovascular studies?",
-            "What are the side effects mentioned for hypertension medications?",
-            "What are the key limitations mentioned in the research?",
-            "What treatment protocols showed the best outcomes?",
-            "What are the contraindications mentioned for the medications?",
-            "What patient populations were studied?",
-            "What statistical methods were used in the analysis?"
-        ]
-        user_question = st.selectbox("Select an example question:", [""] + example_questions)
+        user_question = st.selectbox("Select an example question:", [""] + EXAMPLE_QUESTIONS)
     
     # Query execution
     if st.button("🔍 Ask Question", type="primary", disabled=not user_question.strip()):
@@ -325,12 +322,10 @@ def main():
                 with st.spinner("🤔 Generating response with Gemini..."):
                     try:
                         start_time = time.time()
-                        answer = fallback_chat(user_question)
-                        end_time = time.time()
                         
-                        # Create fallback result format
+                        # Create fallback result format; the answer streams in below
                         result = {
-                            'answer': answer,
+                            'answer_stream': fallback_chat(user_question),
                             'chunks_found': 0,
                             'sources': ['Direct Gemini Response'],
                             'context': 'No document context - using general medical knowledge'
@@ -345,10 +340,9 @@ def main():
             else:
                 with st.spinner("🤔 Searching through medical research documents..."):
                     try:
-                        # Execute full RAG query
+                        # Retrieve now; the answer streams in below
                         start_time = time.time()
-                        result = st.session_state.pipeline.query(user_question, k=retrieval_k)
-                        end_time = time.time()
+                        result = st.session_state.pipeline.stream_query(user_question, k=retrieval_k)
                         
                     except Exception as e:
                         st.error(f"❌ Error during query: {e}")
@@ -361,7 +355,13 @@ def main():
             
             st.markdown('<div class="answer-box">', unsafe_allow_html=True)
             st.markdown("**🤖 AI Assistant Answer:**")
-            st.markdown(result['answer'])
+            try:
+                # Render tokens as they arrive; the full text is kept for history
+                result['answer'] = st.write_stream(result['answer_stream'])
+            except Exception as e:
+                st.error(f"❌ Error during query: {e}")
+                return
+            end_time = time.time()
             st.markdown('</div>', unsafe_allow_html=True)
             
             # Metadata
@@ -390,6 +390,7 @@ def main():
                                disabled=True)
             
             # Save to history
+            st.session_state.query_count += 1
             st.session_state.conversation_history.append({
                 'question': user_question,
                 'answer': result['answer'],
@@ -398,25 +399,98 @@ def main():
                 'timestamp': time.strftime("%Y-%m-%d %H:%M:%S"),
                 'response_time': f"{end_time - start_time:.2f}s"
             })
+
+def main():
+    """Main Streamlit application"""
+    initialize_session_state()
+    
+    # Header
+    st.markdown('<h1 class="main-header">🏥 Medical AI Assistant</h1>', unsafe_allow_html=True)
+    st.markdown("**Query your medical research documents with AI-powered search and generation**")
+    
+    # Sidebar
+    with st.sidebar:
+        st.header("🔧 Configuration")
+        
+        # Pipeline status
+        if st.session_state.pipeline_initialized:
+            st.success("✅ Pipeline Ready")
+        else:
+            st.warning("⏳ Pipeline Not Initialized")
+        
+        st.markdown("---")
+        
+        # Settings
+        st.subheader("⚙️ Query Settings")
+        retrieval_k = st.slider("Number of documents to retrieve", 1, 10, 4)
+        show_context = st.checkbox("Show retrieved context", value=False)
+        
+        st.markdown("---")
+        
+        # Quick actions
+        st.subheader("🚀 Quick Actions")
+        if st.button("🔄 Reinitialize Pipeline"):
+            # Both the cache_resource entries and the process singletons they
+            # wrap must go, otherwise the old instances are handed back
+            _get_pipeline.clear()
+            _get_ragas_evaluator.clear()
+            reset_ragas_evaluator()
+            reset_rag_pipeline()
+            st.session_state.pipeline = None
+            st.session_state.pipeline_initialized = False
+            st.rerun()
+        
+        if st.button("🗑️ Clear History"):
+            st.session_state.conversation_history.clear()
+            st.session_state.query_count = 0
+            st.rerun()
+        
+        # RAGAS Evaluation
+        st.markdown("---")
+        st.subheader("🧪 RAGAS Evaluation")
+        
+        if st.button("🎯 Run RAGAS Test", help="Evaluate RAG system quality"):
+            if st.session_state.pipeline_initialized:
+                run_ragas_evaluation()
+                st.session_state.show_ragas = True
+                st.rerun()
+            else:
+                st.error("Initialize pipeline first")
+        
+        if st.session_state.ragas_results:
+            if st.button("📊 View RAGAS Results"):
+                st.session_state.show_ragas = True
+                st.rerun()
+        
+        st.markdown("---")
+        
+        # System info
+        st.subheader("ℹ️ System Info")
+        st.info("💡 Make sure Qdrant is running on localhost:6333")
+        st.info("📚 Ensure you have ingested medical research PDFs")
+    
+    # Main interface
+    if not st.session_state.pipeline_initialized:
+        # Try to initialize pipeline first
+        if st.button("🚀 Initialize Medical AI Assistant"):
+            load_pipeline()
+            st.rerun()
+        
+        # If still not initialized, check for fallback mode
+        if not st.session_state.pipeline_initialized and not st.session_state.get('fallback_mode', False):
+            st.warning("⚠️ Please initialize the pipeline first")
+            return
+    
+    _query_fragment(retrieval_k, show_context)
     
     # RAGAS Results
     if st.session_state.show_ragas and st.session_state.ragas_results:
         st.markdown("---")
         display_ragas_results()
     
-    # Conversation history
-    if st.session_state.conversation_history:
-        st.markdown("---")
-        display_conversation_history()
-    
     # Footer
     st.markdown("---")
-    st.markdown("""
-    <div style='text-align: center; color: #666; padding: 2rem;'>
-        🏥 Medical AI Assistant - For Research Purposes Only<br>
-        ⚠️ This tool is for informational and research purposes only. Always consult healthcare professionals for medical advice.
-    </div>
-    """, unsafe_allow_html=True)
+    st.markdown(FOOTER_HTML, unsafe_allow_html=True)
 
 if __name__ == "__main__":
     main() 
\ No newline at end of file
@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from typing import Optional
+from functools import lru_cache
 import os
 
 class Settings(BaseSettings):
@@ -14,6 +15,8 @@ class Settings(BaseSettings):
     # API settings
     api_host: str = "0.0.0.0"
     api_port: int = 8000
+    # Development: auto-reload on code changes (single worker); off in production
+    reload: bool = False
     
     # LLM settings (for future use)
     openai_api_key: Optional[str] = None
@@ -24,8 +27,11 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
 
-# Create global settings instance
-settings = Settings()
-
-# Ensure upload directory exists
-os.makedirs(settings.uploads_directory, exist_ok=True) 
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Parse .env once per process and share the result"""
+    settings = Settings()
+    
+    # Ensure upload directory exists
+    os.makedirs(settings.uploads_directory, exist_ok=True)
+    return settings 
\ No newline at end of file
@@ -5,9 +5,12 @@ Run this to create the SQLite database and tables
 """
 
 from .models import create_tables, engine
-from .config import settings
+from .config import get_settings
+import asyncio
 import os
 
+settings = get_settings()
+
 def init_database():
     """Initialize the database and create tables"""
     print("Initializing database...")
@@ -18,7 +21,7 @@ def init_database():
         os.makedirs(data_dir, exist_ok=True)
     
     # Create tables
-    create_tables()
+    asyncio.run(create_tables())
     print(f"Database initialized at: {settings.database_url}")
     print("Tables created: documents, chunks")
 
@@ -1,15 +1,71 @@
-from fastapi import FastAPI
+import queue
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse
 import uvicorn
+from .config import get_settings
 from .routes import router
+from .services.upload_service import shutdown_extraction_pool
+
+settings = get_settings()
+
+# Allowance for multipart boundaries and part headers around the uploaded file
+MULTIPART_OVERHEAD = 64 * 1024
+
+def _start_log_listener() -> QueueListener:
+    """Route backend.* logs through a queue so request handlers never block on stderr"""
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    
+    logger = logging.getLogger("backend")
+    logger.setLevel(logging.INFO)
+    logger.addHandler(QueueHandler(log_queue))
+    logger.propagate = False
+    
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    return listener
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    listener = _start_log_listener()
+    yield
+    # Stop text-extraction worker processes with the server
+    shutdown_extraction_pool()
+    listener.stop()
 
 app = FastAPI(
     title="AI Learning Engine API",
     description="RAG-powered educational assistant backend",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes the document library (datetimes included) much faster
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
-# Enable CORS for Streamlit frontend
+@app.middleware("http")
+async def reject_oversized_bodies(request: Request, call_next):
+    """Refuse bodies whose Content-Length already exceeds the upload limit"""
+    # Runs before the multipart body is parsed, so nothing is spooled to disk;
+    # uploads without the header are still capped while streaming
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > settings.max_file_size + MULTIPART_OVERHEAD:
+        return ORJSONResponse(
+            status_code=413,
+            content={"detail": f"File too large. Maximum size is {settings.max_file_size // (1024*1024)}MB"}
+        )
+    return await call_next(request)
+
+# Compress larger responses (e.g. the document library); small ones aren't worth it
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+# Enable CORS for Streamlit frontend; added last so it is outermost and
+# answers preflight requests before gzip is involved
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],  # In production, specify exact origins
@@ -1,15 +1,45 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, create_engine
+from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Index, event, make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from pydantic import BaseModel
+from sqlalchemy.orm import relationship
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List
 from datetime import datetime
-from .config import settings
+from .config import get_settings
+
+settings = get_settings()
 
 # SQLAlchemy setup
 Base = declarative_base()
-engine = create_engine(settings.database_url, connect_args={"check_same_thread": False})
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_async_engine(
+    # Same database, reached through the aiosqlite driver so queries don't block the event loop
+    make_url(settings.database_url).set(drivername="sqlite+aiosqlite"),
+    # Enough pooled connections that concurrent requests don't queue on one
+    pool_size=10,
+    max_overflow=20
+)
+
+# WAL lets readers proceed while a write is in flight; synchronous=NORMAL
+# skips the fsync on every commit (still durable at WAL checkpoints)
+SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-65536",
+    # SQLite ignores ON DELETE CASCADE unless foreign keys are enabled per connection
+    "PRAGMA foreign_keys=ON",
+)
+
+@event.listens_for(engine.sync_engine, "connect")
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+# Objects stay usable after commit without an implicit (sync) reload
+AsyncSessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)
 
 # SQLAlchemy ORM Models
 class Document(Base):
@@ -27,14 +57,21 @@ class Document(Base):
     processing_status = Column(String, default="pending")  # pending, processing, completed, failed
     extracted_text = Column(Text)  # Content extracted from file or URL
     
-    # Relationship to chunks
-    chunks = relationship("Chunk", back_populates="document", cascade="all, delete-orphan")
+    # Relationship to chunks; never lazy-loaded (use counts or an explicit
+    # selectinload) and deleted in bulk by DocumentService.delete_document
+    chunks = relationship(
+        "Chunk",
+        back_populates="document",
+        cascade="all, delete-orphan",
+        lazy="raise",
+        passive_deletes=True
+    )
 
 class Chunk(Base):
     __tablename__ = "chunks"
     
     id = Column(Integer, primary_key=True, index=True)
-    document_id = Column(Integer, ForeignKey("documents.id"))
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), index=True)
     chunk_text = Column(Text, nullable=False)
     chunk_index = Column(Integer)
     chunk_type = Column(String)  # text, table, image
@@ -43,17 +80,25 @@ class Chunk(Base):
     # Relationship to document
     document = relationship("Document", back_populates="chunks")
 
+# Library listings filter by status and sort newest first
+Index("ix_documents_status_date", Document.processing_status, Document.upload_date.desc())
+
+def _create_all(connection):
+    Base.metadata.create_all(bind=connection)
+    # create_all skips indexes on tables that already exist
+    for table in (Document.__table__, Chunk.__table__):
+        for index in table.indexes:
+            index.create(bind=connection, checkfirst=True)
+
 # Create tables
-def create_tables():
-    Base.metadata.create_all(bind=engine)
+async def create_tables():
+    async with engine.begin() as connection:
+        await connection.run_sync(_create_all)
 
 # Database dependency
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # Pydantic Schemas
 class DocumentBase(BaseModel):
@@ -66,7 +111,9 @@ class DocumentBase(BaseModel):
     file_size: Optional[int] = None
 
 class DocumentCreate(DocumentBase):
-    pass
+    # Known at upload time, so the row is inserted complete in one commit
+    extracted_text: Optional[str] = None
+    processing_status: str = "pending"
 
 class DocumentResponse(DocumentBase):
     id: int
@@ -74,8 +121,7 @@ class DocumentResponse(DocumentBase):
     processing_status: str
     chunk_count: Optional[int] = 0
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class ChunkBase(BaseModel):
     chunk_text: str
@@ -91,8 +137,7 @@ class ChunkResponse(ChunkBase):
     document_id: int
     embedding_id: Optional[str] = None
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class UploadResponse(BaseModel):
     document_id: int
@@ -1,5 +1,5 @@
 from fastapi import APIRouter, Depends, UploadFile, File, HTTPException
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List
 
 from .models import get_db, DocumentResponse, UploadResponse, DocumentLibraryResponse
@@ -11,7 +11,7 @@ router = APIRouter()
 @router.post("/upload", response_model=UploadResponse)
 async def upload_document(
     file: UploadFile = File(...),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Upload a document file (PDF, TXT, MD, DOC)"""
     try:
@@ -34,13 +34,13 @@ async def upload_document(
 async def get_document_library(
     skip: int = 0,
     limit: int = 100,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get list of all uploaded documents with chunk counts"""
     try:
         # Get documents with chunk counts
-        documents = DocumentService.get_documents_with_chunk_count(db)
-        total_count = DocumentService.get_documents_count(db)
+        documents = await DocumentService.get_documents_with_chunk_count(db, skip=skip, limit=limit)
+        total_count = await DocumentService.get_documents_count(db)
         
         # Convert to response format
         document_responses = []
@@ -58,17 +58,13 @@ async def get_document_library(
 @router.get("/documents/{document_id}", response_model=DocumentResponse)
 async def get_document(
     document_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get specific document details"""
-    document = DocumentService.get_document(db, document_id)
+    document, chunk_count = await DocumentService.get_document_with_chunk_count(db, document_id)
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Get chunk count
-    chunks = getattr(document, 'chunks', [])
-    chunk_count = len(chunks) if chunks else 0
-    
     # Convert to response
     doc_dict = {
         'id': document.id,
@@ -89,22 +85,17 @@ async def get_document(
 @router.delete("/documents/{document_id}")
 async def delete_document(
     document_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a document and its associated file"""
-    # Get document info first
-    document = DocumentService.get_document(db, document_id)
-    if not document:
+    # Delete from database; the deleted row tells us which file to remove
+    deleted = await DocumentService.delete_document(db, document_id)
+    if deleted is None:
         raise HTTPException(status_code=404, detail="Document not found")
     
     # Delete file from disk if it exists
-    if document.file_path and document.content_type == "file":
-        UploadService.delete_file(document.file_path)
-    
-    # Delete from database
-    success = DocumentService.delete_document(db, document_id)
-    if not success:
-        raise HTTPException(status_code=500, detail="Failed to delete document")
+    if deleted.file_path and deleted.content_type == "file":
+        UploadService.delete_file(deleted.file_path)
     
     return {"message": "Document deleted successfully"}
 
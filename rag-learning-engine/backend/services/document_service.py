@@ -1,70 +1,133 @@
-from sqlalchemy.orm import Session
-from typing import List, Optional
-from ..models import Document, DocumentCreate, DocumentResponse
-from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer
+from typing import Dict, List, Optional, Tuple
+from ..models import Document, Chunk, DocumentCreate, DocumentResponse
+from sqlalchemy import delete, func, select, update
 
 class DocumentService:
     @staticmethod
-    def create_document(db: Session, document: DocumentCreate) -> Document:
+    async def create_document(db: AsyncSession, document: DocumentCreate) -> Document:
         """Create a new document record in database"""
-        db_document = Document(**document.dict())
+        db_document = Document(**document.model_dump())
         db.add(db_document)
-        db.commit()
-        db.refresh(db_document)
+        # id comes back from the INSERT and defaults are applied in Python, and
+        # objects don't expire on commit, so no refresh SELECT is needed
+        await db.commit()
         return db_document
     
     @staticmethod
-    def get_document(db: Session, document_id: int) -> Optional[Document]:
+    async def get_document(db: AsyncSession, document_id: int) -> Optional[Document]:
         """Get a specific document by ID"""
-        return db.query(Document).filter(Document.id == document_id).first()
+        # Refresh from the database: updates above run as plain UPDATE statements
+        return await db.get(Document, document_id, populate_existing=True)
     
     @staticmethod
-    def get_documents(db: Session, skip: int = 0, limit: int = 100) -> List[Document]:
+    async def get_document_with_chunk_count(db: AsyncSession, document_id: int) -> Tuple[Optional[Document], int]:
+        """Get a document and its chunk count in one query, without loading chunk rows"""
+        result = (await db.execute(
+            select(
+                Document,
+                func.count(Chunk.id)
+            ).outerjoin(
+                Chunk, Chunk.document_id == Document.id
+            ).where(Document.id == document_id).group_by(Document.id)
+        )).first()
+        
+        if result is None:
+            return None, 0
+        return result[0], result[1] or 0
+    
+    @staticmethod
+    async def get_documents(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[Document]:
         """Get list of all documents with pagination"""
-        return db.query(Document).offset(skip).limit(limit).all()
+        return list((await db.scalars(select(Document).offset(skip).limit(limit))).all())
     
     @staticmethod
-    def get_documents_count(db: Session) -> int:
+    async def get_documents_count(db: AsyncSession) -> int:
         """Get total count of documents"""
-        return db.query(func.count(Document.id)).scalar()
+        return await db.scalar(select(func.count(Document.id)))
     
     @staticmethod
-    def update_document_status(db: Session, document_id: int, status: str) -> Optional[Document]:
+    async def bulk_update_statuses(db: AsyncSession, ids_to_status: Dict[int, str]) -> int:
+        """Update processing status for many documents with a single commit"""
+        if not ids_to_status:
+            return 0
+        
+        statuses = set(ids_to_status.values())
+        if len(statuses) == 1:
+            # Same status everywhere: one UPDATE ... WHERE id IN (...)
+            result = await db.execute(
+                update(Document)
+                .where(Document.id.in_(list(ids_to_status)))
+                .values(processing_status=statuses.pop())
+            )
+            updated = result.rowcount
+        else:
+            # ORM bulk UPDATE by primary key (executemany)
+            await db.execute(update(Document), [
+                {'id': document_id, 'processing_status': status}
+                for document_id, status in ids_to_status.items()
+            ])
+            updated = len(ids_to_status)
+        await db.commit()
+        return updated
+    
+    @staticmethod
+    async def update_document_status(db: AsyncSession, document_id: int, status: str) -> Optional[Document]:
         """Update document processing status"""
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.processing_status = status
-            db.commit()
-            db.refresh(document)
-        return document
+        await DocumentService.bulk_update_statuses(db, {document_id: status})
+        return await DocumentService.get_document(db, document_id)
     
     @staticmethod
-    def update_document_text(db: Session, document_id: int, extracted_text: str) -> Optional[Document]:
-        """Update document extracted text"""
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            document.extracted_text = extracted_text
-            db.commit()
-            db.refresh(document)
-        return document
+    async def update_document_text(db: AsyncSession, document_id: int, extracted_text: str,
+                                   status: Optional[str] = None) -> Optional[Document]:
+        """Update document extracted text, and optionally its status in the same commit"""
+        values = {'extracted_text': extracted_text}
+        if status is not None:
+            values['processing_status'] = status
+        await db.execute(update(Document).where(Document.id == document_id).values(**values))
+        await db.commit()
+        return await DocumentService.get_document(db, document_id)
     
     @staticmethod
-    def delete_document(db: Session, document_id: int) -> bool:
-        """Delete a document and its chunks"""
-        document = db.query(Document).filter(Document.id == document_id).first()
-        if document:
-            db.delete(document)
-            db.commit()
-            return True
-        return False
+    async def delete_document(db: AsyncSession, document_id: int):
+        """Delete a document; returns its (file_path, content_type) row, or None if missing"""
+        # No prior SELECT of the row (or its extracted_text). Chunks are removed
+        # explicitly in the same transaction: databases created before the
+        # ON DELETE CASCADE foreign key would otherwise reject the delete
+        await db.execute(
+            delete(Chunk).where(Chunk.document_id == document_id).execution_options(synchronize_session=False)
+        )
+        result = await db.execute(
+            delete(Document)
+            .where(Document.id == document_id)
+            .returning(Document.file_path, Document.content_type)
+            .execution_options(synchronize_session=False)
+        )
+        deleted = result.first()
+        await db.commit()
+        return deleted
     
     @staticmethod
-    def get_documents_with_chunk_count(db: Session) -> List[dict]:
-        """Get documents with their chunk counts for library display"""
-        results = db.query(
-            Document,
-            func.count(Document.chunks).label('chunk_count')
-        ).outerjoin(Document.chunks).group_by(Document.id).all()
+    async def get_documents_with_chunk_count(db: AsyncSession, skip: int = 0, limit: int = 100) -> List[dict]:
+        """Get a page of documents with their chunk counts for library display"""
+        # Count chunks per document once (index-only scan), then join the counts
+        chunk_counts = select(
+            Chunk.document_id,
+            func.count(Chunk.id).label('chunk_count')
+        ).group_by(Chunk.document_id).subquery()
+        
+        # The listing never shows extracted_text, so leave it out of the SELECT
+        results = (await db.execute(
+            select(
+                Document,
+                func.coalesce(chunk_counts.c.chunk_count, 0)
+            ).options(
+                defer(Document.extracted_text)
+            ).outerjoin(
+                chunk_counts, Document.id == chunk_counts.c.document_id
+            ).order_by(Document.upload_date.desc(), Document.id.desc()).offset(skip).limit(limit)
+        )).all()
         
         documents = []
         for doc, chunk_count in results:
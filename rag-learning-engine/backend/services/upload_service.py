@@ -1,53 +1,167 @@
 import os
+import mmap
 import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+import aiofiles
+from concurrent.futures import ProcessPoolExecutor
+from collections import OrderedDict
 from fastapi import UploadFile, HTTPException
-from sqlalchemy.orm import Session
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Tuple
 from pathlib import Path
 import uuid
 from datetime import datetime
 
-from ..config import settings
+from ..config import get_settings
 from ..models import DocumentCreate, Document
 from .document_service import DocumentService
 
+try:
+    import fitz  # PyMuPDF
+    # Plain text with whitespace kept and ligatures expanded (e.g. "ﬁ" -> "fi"),
+    # clipped to the page; no image blocks
+    PDF_TEXT_FLAGS = fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_MEDIABOX_CLIP
+except ImportError:
+    fitz = None
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# Bytes read from the upload per write
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# Uploads up to this size are written in one call instead of streamed
+SMALL_UPLOAD_SIZE = 256 * 1024
+
+def _copy_upload(src, file_path: str):
+    """Copy an upload's spooled file to file_path with large buffered reads"""
+    src.seek(0)
+    with open(file_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, UPLOAD_CHUNK_SIZE)
+
+# Text extraction is CPU-bound; it runs in worker processes off the event loop.
+# Kept small because every uvicorn worker (one per core) has its own pool
+EXTRACTION_WORKERS = 2
+_extraction_pool = None
+_extraction_pool_lock = threading.Lock()
+
+def get_extraction_pool() -> ProcessPoolExecutor:
+    global _extraction_pool
+    # Double-checked so concurrent first uploads start only one pool
+    if _extraction_pool is None:
+        with _extraction_pool_lock:
+            if _extraction_pool is None:
+                _extraction_pool = ProcessPoolExecutor(max_workers=EXTRACTION_WORKERS)
+    return _extraction_pool
+
+def shutdown_extraction_pool():
+    global _extraction_pool
+    with _extraction_pool_lock:
+        if _extraction_pool is not None:
+            _extraction_pool.shutdown(cancel_futures=True)
+            _extraction_pool = None
+
+def _read_text_file(file_path: str) -> str:
+    """Decode a text file straight from a read-only memory map"""
+    with open(file_path, 'rb') as f:
+        # mmap can't map an empty file
+        if os.fstat(f.fileno()).st_size == 0:
+            return ""
+        # str() decodes from the mapped pages, with no intermediate bytes copy
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return str(mm, 'utf-8', errors='replace')
+
+# Extracted PDF text by content sha256 (per worker process), so re-uploading a PDF skips parsing
+PDF_TEXT_CACHE_SIZE = 64
+_pdf_text_cache = OrderedDict()
+
+def _extract_pdf_text(file_path: str) -> str:
+    with open(file_path, 'rb') as f:
+        digest = hashlib.file_digest(f, 'sha256').hexdigest()
+    
+    text = _pdf_text_cache.get(digest)
+    if text is not None:
+        _pdf_text_cache.move_to_end(digest)
+        return text
+    
+    # One pass over the pages, joined once; plain text in stream order,
+    # no block sorting
+    with fitz.open(file_path) as doc:
+        text = "".join([page.get_text("text", flags=PDF_TEXT_FLAGS, sort=False) for page in doc])
+    _pdf_text_cache[digest] = text
+    if len(_pdf_text_cache) > PDF_TEXT_CACHE_SIZE:
+        _pdf_text_cache.popitem(last=False)
+    return text
+
 class UploadService:
     @staticmethod
-    def validate_file(file: UploadFile) -> None:
-        """Validate uploaded file type and size"""
-        # Check file size
-        if hasattr(file, 'size') and file.size > settings.max_file_size:
+    def validate_file(file: UploadFile) -> str:
+        """Validate uploaded file type and size; returns the normalized extension"""
+        # Check file size when it is known up front (it may be None)
+        if getattr(file, 'size', None) is not None and file.size > settings.max_file_size:
             raise HTTPException(
                 status_code=413, 
                 detail=f"File too large. Maximum size is {settings.max_file_size // (1024*1024)}MB"
             )
         
         # Check file type
-        file_extension = Path(file.filename).suffix.lower().lstrip('.')
+        # Plain string split; no Path object per request
+        filename = file.filename or ""
+        file_extension = filename.rpartition('.')[2].lower() if '.' in filename else ''
         if file_extension not in settings.allowed_file_types:
             raise HTTPException(
                 status_code=415,
                 detail=f"File type '{file_extension}' not supported. Allowed types: {', '.join(settings.allowed_file_types)}"
             )
+        return file_extension
     
     @staticmethod
     async def save_uploaded_file(file: UploadFile) -> Tuple[str, str, int]:
         """Save uploaded file to disk and return file info"""
         # Generate unique filename to avoid conflicts
-        file_extension = Path(file.filename).suffix
         unique_filename = f"{uuid.uuid4().hex}_{file.filename}"
         file_path = os.path.join(settings.uploads_directory, unique_filename)
         
         # Ensure uploads directory exists
         os.makedirs(settings.uploads_directory, exist_ok=True)
         
-        # Save file to disk
+        # Write under a temporary name and rename into place once complete, so
+        # a crash mid-write never leaves a truncated file at file_path
+        part_path = file_path + ".part"
         try:
-            with open(file_path, "wb") as buffer:
+            if file.size is not None and file.size <= SMALL_UPLOAD_SIZE:
+                # Small files: one read and one write in a worker thread, rather
+                # than a thread hop per aiofiles open/write/close
                 content = await file.read()
-                buffer.write(content)
+                await run_in_threadpool(Path(part_path).write_bytes, content)
                 file_size = len(content)
+            elif file.size is not None:
+                # Size known (and already validated): copy the spooled upload in
+                # a single worker-thread call instead of awaiting every chunk
+                await run_in_threadpool(_copy_upload, file.file, part_path)
+                file_size = file.size
+            else:
+                # Size unknown: stream file to disk in chunks, rejecting it as
+                # soon as it exceeds the limit
+                file_size = 0
+                async with aiofiles.open(part_path, "wb") as buffer:
+                    while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                        file_size += len(chunk)
+                        if file_size > settings.max_file_size:
+                            raise HTTPException(
+                                status_code=413,
+                                detail=f"File too large. Maximum size is {settings.max_file_size // (1024*1024)}MB"
+                            )
+                        await buffer.write(chunk)
+            os.replace(part_path, file_path)
+        except HTTPException:
+            UploadService.delete_file(part_path)
+            raise
         except Exception as e:
+            UploadService.delete_file(part_path)
             raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
         
         return file_path, unique_filename, file_size
@@ -58,22 +172,14 @@ class UploadService:
         try:
             if file_type.lower() in ['txt', 'md']:
                 # Read text files directly
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return f.read()
+                return _read_text_file(file_path)
             
             elif file_type.lower() == 'pdf':
                 # Basic PDF text extraction using PyMuPDF
-                try:
-                    import fitz  # PyMuPDF
-                    doc = fitz.open(file_path)
-                    text = ""
-                    for page in doc:
-                        text += page.get_text()
-                    doc.close()
-                    return text
-                except ImportError:
+                if fitz is None:
                     # Fallback if PyMuPDF not installed
                     return f"PDF file uploaded: {os.path.basename(file_path)}. Text extraction requires PyMuPDF."
+                return _extract_pdf_text(file_path)
             
             else:
                 # For other file types, return filename for now
@@ -83,16 +189,28 @@ class UploadService:
             return f"Error extracting text: {str(e)}"
     
     @staticmethod
-    async def upload_file(db: Session, file: UploadFile) -> Document:
+    async def upload_file(db: AsyncSession, file: UploadFile) -> Document:
         """Complete file upload process"""
-        # Validate file
-        UploadService.validate_file(file)
+        # Validate file (before anything touches disk) and get its type
+        file_extension = UploadService.validate_file(file)
         
         # Save file to disk
         file_path, unique_filename, file_size = await UploadService.save_uploaded_file(file)
         
-        # Get file type
-        file_extension = Path(file.filename).suffix.lower().lstrip('.')
+        # Extract basic text content before the insert, so the record is
+        # written once with its text and final status
+        extracted_text = None
+        try:
+            # Parse in a worker process so other requests keep being served
+            loop = asyncio.get_running_loop()
+            extracted_text = await loop.run_in_executor(
+                get_extraction_pool(), UploadService.extract_basic_text, file_path, file_extension
+            )
+            processing_status = "completed"
+        except Exception:
+            processing_status = "failed"
+            # Log error but don't fail the upload
+            logger.exception("Text extraction failed for %s", unique_filename)
         
         # Create document record
         document_data = DocumentCreate(
@@ -101,21 +219,13 @@ class UploadService:
             file_path=file_path,
             content_type="file",
             file_type=file_extension,
-            file_size=file_size
+            file_size=file_size,
+            extracted_text=extracted_text,
+            processing_status=processing_status
         )
         
         # Save to database
-        document = DocumentService.create_document(db, document_data)
-        
-        # Extract basic text content
-        try:
-            extracted_text = UploadService.extract_basic_text(file_path, file_extension)
-            DocumentService.update_document_text(db, document.id, extracted_text)
-            DocumentService.update_document_status(db, document.id, "completed")
-        except Exception as e:
-            DocumentService.update_document_status(db, document.id, "failed")
-            # Log error but don't fail the upload
-            print(f"Text extraction failed for document {document.id}: {str(e)}")
+        document = await DocumentService.create_document(db, document_data)
         
         return document
     
@@ -126,6 +236,6 @@ class UploadService:
             if os.path.exists(file_path):
                 os.remove(file_path)
                 return True
-        except Exception as e:
-            print(f"Failed to delete file {file_path}: {str(e)}")
+        except Exception:
+            logger.exception("Failed to delete file %s", file_path)
         return False 
\ No newline at end of file
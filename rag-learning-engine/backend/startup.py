@@ -4,9 +4,12 @@ Startup script for the AI Learning Engine Backend
 Initializes database and starts the FastAPI server
 """
 
+import os
 import uvicorn
 from init_db import init_database
-from config import settings
+from config import get_settings
+
+settings = get_settings()
 
 def startup():
     """Initialize database and start the server"""
@@ -17,11 +20,17 @@ def startup():
     
     # Start FastAPI server
     print(f"Starting server on {settings.api_host}:{settings.api_port}")
+    # One worker per core in production; "auto" picks uvloop/httptools when
+    # installed (uvloop isn't on Windows). Reload only works with a single
+    # worker, so it stays a dev-only flag
     uvicorn.run(
         "main:app",
         host=settings.api_host,
         port=settings.api_port,
-        reload=True
+        workers=1 if settings.reload else os.cpu_count(),
+        loop="auto",
+        http="auto",
+        reload=settings.reload
     )
 
 if __name__ == "__main__":
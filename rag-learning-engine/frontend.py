@@ -1,5 +1,9 @@
 # streamlit run frontend.py --server.port 8501
 
+import os
+import shutil
+import hashlib
+import tempfile
 import streamlit as st
 from io import BytesIO
 from pathlib import Path
@@ -9,11 +13,39 @@ st.set_page_config(page_title="AI Learning Engine", layout="wide")
 
 st.title("📚 AI Learning Engine")
 
+# Bytes read from the network per write when downloading a URL
+URL_CHUNK_SIZE = 1 << 16
+
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def fetch_url(url: str, dest_dir: str) -> tuple[str, str]:
+    """Download a remote document once per URL into dest_dir; returns (filename, path)"""
+    filename = url.split("/")[-1] or "downloaded_file"
+    # Named after the URL, so a re-download after the TTL overwrites the old copy
+    path = os.path.join(dest_dir, hashlib.sha256(url.encode("utf-8")).hexdigest()[:16] + Path(filename).suffix)
+    # Stream to disk so memory stays constant whatever the document size
+    with requests.get(url, stream=True, timeout=10) as resp:
+        resp.raise_for_status()
+        with open(path, "wb") as f:
+            for chunk in resp.iter_content(chunk_size=URL_CHUNK_SIZE):
+                f.write(chunk)
+    return filename, path
+
+@st.cache_data(ttl=600, max_entries=256, show_spinner=False)
+def run_rag(query: str, files_key: tuple) -> str:
+    """Answer a query over the library; files_key invalidates when the library changes"""
+    # Placeholder: integrate retrieval‑and‑generation backend here
+    return "*(RAG output will appear here once backend is connected)*"
+
 # Initialize session state containers
+if "file_dir" not in st.session_state:
+    # Per-session temp directory, removed when the session is garbage collected
+    st.session_state.file_dir = tempfile.TemporaryDirectory(prefix="learning_engine_")
 if "uploaded_files" not in st.session_state:
-    st.session_state.uploaded_files = []  # [(filename, bytes)]
+    st.session_state.uploaded_files = {}  # {uploader file id: (filename, temp file path)}
 if "remote_files" not in st.session_state:
-    st.session_state.remote_files = []    # list of (filename, bytes)
+    st.session_state.remote_files = {}    # {url: (filename, temp file path)}
+
+file_dir = st.session_state.file_dir.name
 
 # ---------- Layout ---------- #
 left, right = st.columns([1, 2], gap="large")
@@ -29,10 +61,25 @@ with left:
         accept_multiple_files=True,
     )
 
+    # Drop files that were removed from the uploader, along with their temp copies
+    current_ids = {file.file_id for file in files or []}
+    for file_id in st.session_state.uploaded_files.keys() - current_ids:
+        _, path = st.session_state.uploaded_files.pop(file_id)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
     if files:
         for file in files:
-            # Save file content in memory (demo purpose)
-            st.session_state.uploaded_files.append((file.name, file.read()))
+            # The uploader returns the same files on every rerun; store each once
+            if file.file_id in st.session_state.uploaded_files:
+                continue
+            # Spill to the session's temp dir and keep only the path, not the bytes
+            path = os.path.join(file_dir, f"{file.file_id}{Path(file.name).suffix}")
+            with open(path, "wb") as f:
+                shutil.copyfileobj(file, f)
+            st.session_state.uploaded_files[file.file_id] = (file.name, path)
         st.success(f"Uploaded {len(files)} file(s).")
 
     st.divider()
@@ -44,10 +91,8 @@ with left:
 
     if add_url and url_input:
         try:
-            resp = requests.get(url_input, timeout=10)
-            resp.raise_for_status()
-            filename = url_input.split("/")[-1] or "downloaded_file"
-            st.session_state.remote_files.append((filename, resp.content))
+            filename, path = fetch_url(url_input, file_dir)
+            st.session_state.remote_files[url_input] = (filename, path)
             st.success(f"Added {filename} from URL.")
         except Exception as e:
             st.error(f"Failed to fetch the file: {e}")
@@ -56,7 +101,7 @@ with left:
 
     # 3️⃣ Library display
     st.header("🗂️ Your Library")
-    all_files = [f[0] for f in st.session_state.uploaded_files] + [f[0] for f in st.session_state.remote_files]
+    all_files = [f[0] for f in st.session_state.uploaded_files.values()] + [f[0] for f in st.session_state.remote_files.values()]
     if all_files:
         for fname in all_files:
             st.write("•", fname)
@@ -82,7 +127,9 @@ with right:
             st.warning("Please upload or link at least one document first.")
         else:
             with st.spinner("🔎 Running RAG pipeline…"):
-                # Placeholder: integrate retrieval‑and‑generation backend here
-                answer = "*(RAG output will appear here once backend is connected)*"
+                # Identical questions over the same library are answered from cache
+                library = [*st.session_state.uploaded_files.values(), *st.session_state.remote_files.values()]
+                files_key = tuple(sorted(f[0] for f in library))
+                answer = run_rag(query.strip(), files_key)
             st.markdown("### 📑 Answer")
             st.write(answer)